@@ -35,6 +35,7 @@ class InstrumentAnalysisOrchestrator:
         self.selected_instruments = []
         self.analysis_results = {}
         self.current_phase = "idle"
+        self.status_version = 0  # Bumped whenever workflow status changes
         
     def start_analysis(self, user_input: str) -> str:
         """
@@ -52,6 +53,7 @@ class InstrumentAnalysisOrchestrator:
         try:
             # Phase 1: Instrument Discovery
             self.current_phase = "discovery"
+            self.status_version += 1
             logger.info("Phase 1: Instrument Discovery")
             
             instruments, presentation = self.discovery_agent.run_discovery_phase(user_input)
@@ -59,6 +61,7 @@ class InstrumentAnalysisOrchestrator:
             if instruments:
                 # If instruments were directly found, store them
                 self.selected_instruments = instruments
+                self.status_version += 1
                 return self._format_discovery_results(instruments, presentation)
             else:
                 # Present options to user for selection
@@ -108,6 +111,7 @@ class InstrumentAnalysisOrchestrator:
         """
         logger.info("Phase 2: Data Collection")
         self.current_phase = "data_collection"
+        self.status_version += 1
         
         try:
             # Show both name and trading symbol for clarity
@@ -164,6 +168,7 @@ class InstrumentAnalysisOrchestrator:
             'current_phase': self.current_phase,
             'selected_instruments': len(self.selected_instruments),
             'analysis_results': len(self.analysis_results),
+            'status_version': self.status_version,
             'timestamp': datetime.now().isoformat()
         }
     
@@ -173,6 +178,7 @@ class InstrumentAnalysisOrchestrator:
         self.selected_instruments = []
         self.analysis_results = {}
         self.current_phase = "idle"
+        self.status_version += 1
 
 def main():
     """Test the orchestrator."""
@@ -6,6 +6,7 @@ Provides a modern web interface for the instrument analysis workflow.
 import os
 import sys
 import json
+import time
 import logging
 from datetime import datetime
 from typing import Dict, List, Optional
@@ -13,7 +14,7 @@ from typing import Dict, List, Optional
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, Response, render_template, request, jsonify, session
 from .orchestrator import InstrumentAnalysisOrchestrator
 
 # Configure logging
@@ -26,6 +27,9 @@ app.secret_key = 'ai_instrument_analysis_secret_key'
 # Global orchestrator instance
 orchestrator = None
 
+# Seconds between status_version checks in the /api/events stream
+STATUS_EVENT_INTERVAL = 0.25
+
 def get_orchestrator():
     """Get or create orchestrator instance."""
     global orchestrator
@@ -94,6 +98,23 @@ def get_status():
         logger.error(f"Error getting status: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/events', methods=['GET'])
+def status_events():
+    """Stream workflow status as Server-Sent Events, pushing only on change."""
+    orch = get_orchestrator()
+    
+    def generate():
+        last_version = -1
+        while True:
+            version = orch.status_version
+            if version != last_version:
+                last_version = version
+                yield f"data: {json.dumps(orch.get_current_status())}\n\n"
+            time.sleep(STATUS_EVENT_INTERVAL)
+    
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
+
 @app.route('/api/reset', methods=['POST'])
 def reset_workflow():
     """Reset the workflow."""
@@ -456,6 +477,12 @@ def create_templates():
                     sendMessage();
                 }
             });
+            
+            // Status updates are pushed by the server only when they change
+            const statusEvents = new EventSource('/api/events');
+            statusEvents.onmessage = function(e) {
+                updateStatus(JSON.parse(e.data));
+            };
         });
         
         function sendMessage() {
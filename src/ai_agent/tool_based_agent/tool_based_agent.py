@@ -5,14 +5,225 @@ An AI agent that uses Python tools to perform instrument analysis tasks.
 """
 import logging
 import re
-from typing import List, Dict, Optional, Tuple, Any
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import List, Dict, Iterator, Optional, Tuple, Any
 from datetime import datetime
 
-from .tools.instrument_search_tool import search_instruments_tool, get_instrument_details_tool
-from .tools.data_collection_tool import fetch_instrument_data_tool, fetch_multiple_instruments_tool
+# google-re2 gives linear-time matching for the selection pattern when installed
+try:
+    import re2 as _re_fast
+except ImportError:
+    _re_fast = re
 
 logger = logging.getLogger(__name__)
 
+# Intent types, also used as the response 'action'. Interned so that the
+# intent-to-handler lookup and the returned dicts share one string object each.
+INTENT_SEARCH = sys.intern('search')
+INTENT_SELECTION = sys.intern('selection')
+INTENT_DATA_COLLECTION = sys.intern('data_collection')
+INTENT_RESET = sys.intern('reset')
+INTENT_UNKNOWN = sys.intern('unknown')
+
+# Precompiled patterns used on every user turn
+_WORD_RE = re.compile(r'\b\w+\b')
+_NUMBER_SEL_RE = _re_fast.compile(r'^\s*\d+(\s*[,\s]\s*\d+)*\s*$')
+_INDEX_LIST_RE = re.compile(r'^[\d,\s]*\d[\d,\s]*$')
+_INT_TOKEN_RE = re.compile(r'\d+')
+
+# Common words dropped from search terms
+_STOPWORDS = frozenset({
+    'i', 'want', 'to', 'analyze', 'check', 'look', 'at', 'the', 'a', 'an',
+    'and', 'or', 'but', 'in', 'on', 'for', 'of', 'with', 'by',
+    'show', 'me', 'find', 'search', 'get', 'data', 'fetch', 'collect'
+})
+
+# Intent and instrument keywords mapped to the (category, value) tags they
+# contribute. Matching is by substring, so e.g. 'banknifty' also hits 'nifty'.
+_KEYWORD_TAGS = {
+    'reset': (('reset', 'reset'),),
+    'start over': (('reset', 'reset'),),
+    'clear': (('reset', 'reset'),),
+    'fetch': (('data_collection', 'data_collection'),),
+    'get data': (('data_collection', 'data_collection'),),
+    'collect data': (('data_collection', 'data_collection'),),
+    'download': (('data_collection', 'data_collection'),),
+    'nifty': (('instruments', 'nifty'),),
+    'banknifty': (('instruments', 'banknifty'),),
+    'reliance': (('instruments', 'reliance'),),
+    'tcs': (('instruments', 'tcs'),),
+    'infy': (('instruments', 'infy'),),
+    'hdfc': (('instruments', 'hdfc'),),
+    'icici': (('instruments', 'icici'),),
+}
+
+# Output order of tag values within each category
+_CATEGORY_ORDER = {
+    'reset': ('reset',),
+    'data_collection': ('data_collection',),
+    'instruments': ('nifty', 'banknifty', 'reliance', 'tcs', 'infy', 'hdfc', 'icici'),
+}
+
+class _KeywordAutomaton:
+    """
+    Aho-Corasick automaton that reports the tags of every keyword
+    occurring in a string in a single left-to-right pass.
+    """
+    
+    def __init__(self, keyword_tags: Dict[str, Tuple[Tuple[str, str], ...]]):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        
+        # Build the keyword trie
+        for keyword, tags in keyword_tags.items():
+            state = 0
+            for ch in keyword:
+                next_state = self._goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][ch] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = next_state
+            self._out[state] += tags
+        
+        # Breadth-first pass to wire failure links and merge outputs
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(ch, 0)
+                self._out[next_state] += self._out[self._fail[next_state]]
+    
+    def scan(self, text: str) -> set:
+        """Return the set of (category, value) tags found in text."""
+        goto, fail, out = self._goto, self._fail, self._out
+        hits = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                hits.update(out[state])
+        return hits
+
+_KEYWORD_AUTOMATON = _KeywordAutomaton(_KEYWORD_TAGS)
+
+def _scan_keywords(input_lower: str) -> Dict[str, List[str]]:
+    """Classify all recognized keywords in lowercased input by category."""
+    hits = _KEYWORD_AUTOMATON.scan(input_lower)
+    return {
+        category: [value for value in order if (category, value) in hits]
+        for category, order in _CATEGORY_ORDER.items()
+    }
+
+# Exchange / instrument type flags, set from whole-word tokens
+_NSE, _BSE, _NFO, _FUT, _OPT, _EQ = 1, 2, 4, 8, 16, 32
+
+_TOKEN_FLAGS = {
+    'nse': _NSE,
+    'bse': _BSE,
+    'nfo': _NFO,
+    'futures': _NFO | _FUT,
+    'future': _FUT,
+    'fut': _FUT,
+    'options': _OPT,
+    'ce': _OPT,
+    'pe': _OPT,
+    'equity': _EQ,
+    'stock': _EQ,
+    'stocks': _EQ,
+    'eq': _EQ,
+}
+
+_EXCHANGE_FLAGS = ((_NSE, 'NSE'), (_BSE, 'BSE'), (_NFO, 'NFO'))
+_TYPE_FLAGS = ((_FUT, ('FUT',)), (_OPT, ('CE', 'PE')), (_EQ, ('EQ',)))
+
+# Preferred exchanges / types for every flag combination, indexed by mask
+_MASK_LIMIT = _EQ << 1
+_MASK_EXCHANGES = tuple(
+    tuple(name for flag, name in _EXCHANGE_FLAGS if mask & flag)
+    for mask in range(_MASK_LIMIT)
+)
+_MASK_TYPES = tuple(
+    tuple(t for flag, names in _TYPE_FLAGS if mask & flag for t in names)
+    for mask in range(_MASK_LIMIT)
+)
+
+# (last whole second seen by _now_iso(), its formatted timestamp); replaced as one
+# tuple so threads never pair a second with another second's string
+_last_timestamp = (0, "")
+
+def _now_iso() -> str:
+    """Return the current local time as an ISO string, at one-second resolution."""
+    global _last_timestamp
+    now = int(time.time())
+    second, iso = _last_timestamp
+    if now != second:
+        iso = datetime.fromtimestamp(now).isoformat()
+        _last_timestamp = (now, iso)
+    return iso
+
+# Tools the agent can call; the tool modules themselves are imported on first use
+_TOOL_NAMES = (
+    'search_instruments',
+    'get_instrument_details',
+    'fetch_instrument_data',
+    'fetch_multiple_instruments'
+)
+
+class AgentResponse:
+    """Result of handling one user turn; unset optional fields are omitted from as_dict()."""
+    
+    __slots__ = ('success', 'response', 'action', 'results', 'selected_instruments', 'phase', 'error')
+    
+    def __init__(self, success: bool, response: str, action: str,
+                 results: Optional[Dict] = None,
+                 selected_instruments: Optional[List[Dict]] = None,
+                 phase: Optional[str] = None,
+                 error: Optional[str] = None):
+        self.success = success
+        self.response = response
+        self.action = action
+        self.results = results
+        self.selected_instruments = selected_instruments
+        self.phase = phase
+        self.error = error
+    
+    def as_dict(self) -> Dict:
+        """Convert to the response dictionary returned by process_user_input."""
+        return {
+            name: getattr(self, name)
+            for name in self.__slots__
+            if getattr(self, name) is not None
+        }
+
+# Maximum number of turns kept in conversation_history
+MAX_CONVERSATION_HISTORY = 1000
+
+# Size and lifetime (seconds) of the cache of search tool results
+SEARCH_CACHE_SIZE = 128
+SEARCH_CACHE_TTL = 300
+
+# Search results shared by all agents, so every chat session benefits from the cache.
+# Concurrent identical searches wait on the in-flight call instead of repeating it.
+_SEARCH_CACHE = OrderedDict()  # (terms, exchanges, types, limit) -> (expires_at, results)
+_SEARCH_IN_FLIGHT = {}  # (terms, exchanges, types, limit) -> Future
+_SEARCH_LOCK = threading.Lock()
+
 class ToolBasedAgent:
     """
     AI Agent that uses tools to perform tasks.
@@ -20,17 +231,50 @@ class ToolBasedAgent:
     
     def __init__(self):
         """Initialize the tool-based agent."""
-        self.conversation_history = []
+        self.conversation_history = deque(maxlen=MAX_CONVERSATION_HISTORY)
         self.selected_instruments = []
         self.current_phase = "idle"
         self.last_search_results = []  # Store last search results for selection
-        self.available_tools = {
-            'search_instruments': search_instruments_tool,
-            'get_instrument_details': get_instrument_details_tool,
-            'fetch_instrument_data': fetch_instrument_data_tool,
-            'fetch_multiple_instruments': fetch_multiple_instruments_tool
+        self.available_tools = None  # Populated lazily by _tools()
+        self._status_key = None  # State the cached status snapshot was built from
+        self._status_snapshot = None
+        self._state_version = 0  # Bumped whenever a turn or reset may change the status
+        self.instance_id = uuid.uuid4().hex  # Tells this agent's state versions from another's
+        self._intent_handlers = {
+            INTENT_SEARCH: self._handle_search_intent,
+            INTENT_SELECTION: self._handle_selection_intent,
+            INTENT_DATA_COLLECTION: self._handle_data_collection_intent,
+            INTENT_RESET: lambda intent: self._handle_reset_intent()
         }
     
+    def _tools(self) -> Dict[str, Any]:
+        """Return the tool registry, importing the tool modules on first use."""
+        if self.available_tools is None:
+            from .tools.instrument_search_tool import search_instruments_tool, get_instrument_details_tool
+            from .tools.data_collection_tool import fetch_instrument_data_tool, fetch_multiple_instruments_tool
+            
+            self.available_tools = {
+                'search_instruments': search_instruments_tool,
+                'get_instrument_details': get_instrument_details_tool,
+                'fetch_instrument_data': fetch_instrument_data_tool,
+                'fetch_multiple_instruments': fetch_multiple_instruments_tool
+            }
+        return self.available_tools
+    
+    @property
+    def last_search_results(self) -> List[Dict]:
+        """Results of the last search, available for selection."""
+        return self._last_search_results
+    
+    @last_search_results.setter
+    def last_search_results(self, results: List[Dict]):
+        """Store search results and index them by lowercased symbol and name."""
+        self._last_search_results = results
+        self._symbol_index = {}
+        for instrument in results:
+            self._symbol_index.setdefault(instrument['tradingsymbol'].lower(), instrument)
+            self._symbol_index.setdefault(instrument['name'].lower(), instrument)
+    
     def process_user_input(self, user_input: str) -> Dict:
         """
         Process user input and determine appropriate action.
@@ -41,28 +285,68 @@ class ToolBasedAgent:
         Returns:
             Dictionary with response and action taken
         """
+        intent = self._begin_turn(user_input)
+        return self._dispatch_intent(intent, user_input)
+    
+    def process_user_input_stream(self, user_input: str) -> Iterator[Dict]:
+        """
+        Process user input, reporting the chosen action before running it.
+        
+        Args:
+            user_input: User's natural language input
+            
+        Yields:
+            A 'progress' event naming the action, then a 'result' event
+            carrying the same dictionary process_user_input returns
+        """
+        intent = self._begin_turn(user_input)
+        yield {'event': 'progress', 'action': intent['type']}
+        yield {'event': 'result', 'result': self._dispatch_intent(intent, user_input)}
+    
+    def reset(self) -> Dict:
+        """
+        Reset the workflow directly, without parsing a user message.
+        
+        Returns:
+            Dictionary with the same shape process_user_input returns for a reset
+        """
+        self._state_version += 1
+        return self._handle_reset_intent().as_dict()
+    
+    def warm_up(self):
+        """Import the tool modules and prime the intent parser, without changing agent state."""
+        self._tools()
+        self._parse_user_intent("Show me NIFTY futures")
+    
+    @property
+    def state_version(self) -> int:
+        """Counter that changes whenever the agent status may have changed."""
+        return self._state_version
+    
+    def _begin_turn(self, user_input: str) -> Dict:
+        """Record the user turn in the conversation history and parse its intent."""
         logger.info(f"Processing user input: {user_input}")
+        self._state_version += 1
         
         # Add to conversation history
         self.conversation_history.append({
             'user': user_input,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': _now_iso()
         })
         
         # Parse user intent
-        intent = self._parse_user_intent(user_input)
-        
-        # Execute appropriate action based on intent
-        if intent['type'] == 'search':
-            return self._handle_search_intent(intent)
-        elif intent['type'] == 'selection':
-            return self._handle_selection_intent(intent)
-        elif intent['type'] == 'data_collection':
-            return self._handle_data_collection_intent(intent)
-        elif intent['type'] == 'reset':
-            return self._handle_reset_intent()
-        else:
-            return self._handle_unknown_intent(user_input)
+        return self._parse_user_intent(user_input)
+    
+    def _dispatch_intent(self, intent: Dict, user_input: str) -> Dict:
+        """Execute the handler for a parsed intent and return its response dictionary."""
+        handler = self._intent_handlers.get(intent['type'])
+        try:
+            if handler is None:
+                return self._handle_unknown_intent(user_input).as_dict()
+            return handler(intent).as_dict()
+        finally:
+            # Bump again once the handler is done, so a status read mid-turn is not reused
+            self._state_version += 1
     
     def _parse_user_intent(self, user_input: str) -> Dict:
         """
@@ -74,96 +358,100 @@ class ToolBasedAgent:
         Returns:
             Dictionary with intent type and parameters
         """
+        # Fast path: pure index selections such as "1" or "1, 3"
+        stripped = user_input.strip()
+        if (stripped[:1].isdigit() and self.last_search_results
+                and all(c.isdigit() or c in ', ' for c in stripped)):
+            return {
+                'type': INTENT_SELECTION,
+                'selection': user_input,
+                'selection_lower': stripped,
+                'original_input': user_input
+            }
+        
+        cached = self._parse_intent_cached(user_input, bool(self.last_search_results))
+        # Cached intents are immutable; hand callers fresh lists
+        return {key: list(value) if isinstance(value, tuple) else value for key, value in cached}
+    
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def _parse_intent_cached(user_input: str, has_results: bool) -> Tuple[Tuple[str, Any], ...]:
+        """
+        Parse user input into intent items, memoized on the input and on
+        whether there are search results to select from.
+        """
         input_lower = user_input.lower().strip()
+        words = _WORD_RE.findall(input_lower)
+        keywords = _scan_keywords(input_lower)
         
         # Check for reset intent
-        if any(word in input_lower for word in ['reset', 'start over', 'clear']):
-            return {'type': 'reset'}
+        if keywords['reset']:
+            intent = {'type': INTENT_RESET}
         
         # Check for data collection intent
-        if any(word in input_lower for word in ['fetch', 'get data', 'collect data', 'download']):
-            return {'type': 'data_collection'}
+        elif keywords['data_collection']:
+            intent = {'type': INTENT_DATA_COLLECTION}
         
         # Check for selection (numbers or short instrument names)
         # Only treat as selection if we have previous search results
-        if self._is_selection_input(user_input) and self.last_search_results:
-            return {
-                'type': 'selection',
+        elif ToolBasedAgent._is_selection_input(user_input, words, keywords) and has_results:
+            intent = {
+                'type': INTENT_SELECTION,
                 'selection': user_input,
+                'selection_lower': input_lower,
                 'original_input': user_input
             }
         
         # Default to search intent
-        return {
-            'type': 'search',
-            'search_terms': self._extract_search_terms(input_lower),
-            'preferred_exchanges': self._extract_exchanges(input_lower),
-            'preferred_types': self._extract_instrument_types(input_lower),
-            'original_input': user_input
-        }
-    
-    def _extract_search_terms(self, input_lower: str) -> List[str]:
-        """Extract search terms from user input."""
-        # Remove common words
-        common_words = {
-            'i', 'want', 'to', 'analyze', 'check', 'look', 'at', 'the', 'a', 'an', 
-            'and', 'or', 'but', 'in', 'on', 'at', 'for', 'of', 'with', 'by',
-            'show', 'me', 'find', 'search', 'get', 'data', 'fetch', 'collect'
-        }
+        else:
+            mask = 0
+            for word in words:
+                mask |= _TOKEN_FLAGS.get(word, 0)
+            
+            intent = {
+                'type': INTENT_SEARCH,
+                'search_terms': ToolBasedAgent._extract_search_terms(words),
+                'preferred_exchanges': _MASK_EXCHANGES[mask],
+                'preferred_types': _MASK_TYPES[mask],
+                'original_input': user_input
+            }
         
-        words = re.findall(r'\b\w+\b', input_lower)
-        search_terms = [word for word in words if word not in common_words and len(word) > 2]
+        return tuple(
+            (key, tuple(value) if isinstance(value, list) else value)
+            for key, value in intent.items()
+        )
+    
+    @staticmethod
+    def _extract_search_terms(words: List[str]) -> List[str]:
+        """Extract search terms from tokenized user input."""
+        search_terms = [word for word in words if word not in _STOPWORDS and len(word) > 2]
         
         return search_terms
     
-    def _extract_exchanges(self, input_lower: str) -> List[str]:
-        """Extract preferred exchanges from user input."""
-        exchanges = []
-        if 'nse' in input_lower:
-            exchanges.append('NSE')
-        if 'bse' in input_lower:
-            exchanges.append('BSE')
-        if 'nfo' in input_lower or 'futures' in input_lower:
-            exchanges.append('NFO')
-        return exchanges
-    
-    def _extract_instrument_types(self, input_lower: str) -> List[str]:
-        """Extract preferred instrument types from user input."""
-        types = []
-        if any(word in input_lower for word in ['futures', 'fut']):
-            types.append('FUT')
-        if any(word in input_lower for word in ['options', 'ce', 'pe']):
-            types.extend(['CE', 'PE'])
-        if any(word in input_lower for word in ['equity', 'stock', 'eq']):
-            types.append('EQ')
-        return types
-    
-    def _is_selection_input(self, user_input: str) -> bool:
+    @staticmethod
+    def _is_selection_input(user_input: str, words: List[str],
+                            keywords: Dict[str, List[str]]) -> bool:
         """Check if input is a selection."""
         # Check for number patterns
-        number_pattern = r'^\s*\d+(\s*[,\s]\s*\d+)*\s*$'
-        if re.match(number_pattern, user_input):
+        if _NUMBER_SEL_RE.match(user_input):
             return True
         
         # Check for short instrument names
-        words = user_input.split()
         if len(words) <= 3:
-            instrument_names = ['nifty', 'banknifty', 'reliance', 'tcs', 'infy', 'hdfc', 'icici']
-            return any(name in user_input.lower() for name in instrument_names)
+            return bool(keywords['instruments'])
         
         return False
     
-    def _handle_search_intent(self, intent: Dict) -> Dict:
+    def _handle_search_intent(self, intent: Dict) -> AgentResponse:
         """Handle search intent using the search tool."""
         logger.info("Handling search intent")
         
         try:
-            # Use the search tool
-            search_results = self.available_tools['search_instruments'](
-                search_terms=intent['search_terms'],
-                preferred_exchanges=intent['preferred_exchanges'],
-                preferred_types=intent['preferred_types'],
-                limit=10
+            # Use the search tool, reusing results for repeated queries
+            search_results = self._cached_search(
+                intent['search_terms'],
+                intent['preferred_exchanges'],
+                intent['preferred_types']
             )
             
             # Store search results for selection
@@ -175,37 +463,95 @@ class ToolBasedAgent:
             # Update phase
             self.current_phase = "discovery"
             
-            return {
-                'success': True,
-                'response': response,
-                'action': 'search',
-                'results': search_results,
-                'phase': self.current_phase
-            }
+            return AgentResponse(
+                success=True,
+                response=response,
+                action=INTENT_SEARCH,
+                results=search_results,
+                phase=self.current_phase
+            )
             
         except Exception as e:
             logger.error(f"Error in search: {str(e)}")
-            return {
-                'success': False,
-                'response': f"Error performing search: {str(e)}",
-                'action': 'search',
-                'error': str(e)
-            }
+            return AgentResponse(
+                success=False,
+                response=f"Error performing search: {str(e)}",
+                action=INTENT_SEARCH,
+                error=str(e)
+            )
     
-    def _handle_selection_intent(self, intent: Dict) -> Dict:
+    def _cached_search(self, search_terms: List[str], preferred_exchanges: List[str],
+                       preferred_types: List[str], limit: int = 10) -> Dict:
+        """
+        Run the search tool, serving repeated queries from a shared TTL-bounded LRU cache.
+        
+        Args:
+            search_terms: Terms to search for
+            preferred_exchanges: Exchanges to rank first
+            preferred_types: Instrument types to rank first
+            limit: Maximum number of results
+            
+        Returns:
+            Search tool result dictionary
+        """
+        key = (tuple(search_terms), tuple(preferred_exchanges), tuple(preferred_types), limit)
+        
+        with _SEARCH_LOCK:
+            cached = _SEARCH_CACHE.get(key)
+            if cached is not None and cached[0] > time.monotonic():
+                _SEARCH_CACHE.move_to_end(key)
+                return cached[1]
+            
+            pending = _SEARCH_IN_FLIGHT.get(key)
+            if pending is None:
+                pending = _SEARCH_IN_FLIGHT[key] = Future()
+                owner = True
+            else:
+                owner = False
+        
+        if not owner:
+            return pending.result()
+        
+        try:
+            search_results = self._tools()['search_instruments'](
+                search_terms=search_terms,
+                preferred_exchanges=preferred_exchanges,
+                preferred_types=preferred_types,
+                limit=limit
+            )
+        except Exception as e:
+            # Failed searches are not cached, so the next request retries
+            with _SEARCH_LOCK:
+                del _SEARCH_IN_FLIGHT[key]
+            pending.set_exception(e)
+            raise
+        
+        with _SEARCH_LOCK:
+            _SEARCH_CACHE[key] = (time.monotonic() + SEARCH_CACHE_TTL, search_results)
+            _SEARCH_CACHE.move_to_end(key)
+            if len(_SEARCH_CACHE) > SEARCH_CACHE_SIZE:
+                _SEARCH_CACHE.popitem(last=False)
+            del _SEARCH_IN_FLIGHT[key]
+        pending.set_result(search_results)
+        
+        return search_results
+    
+    def _handle_selection_intent(self, intent: Dict) -> AgentResponse:
         """Handle selection intent."""
         logger.info("Handling selection intent")
         
         try:
             # Validate selection
-            validated_instruments = self._validate_selection(intent['selection'])
+            validated_instruments = self._validate_selection(
+                intent['selection'], intent.get('selection_lower')
+            )
             
             if not validated_instruments:
-                return {
-                    'success': False,
-                    'response': "No valid instruments selected. Please try again.",
-                    'action': 'selection'
-                }
+                return AgentResponse(
+                    success=False,
+                    response="No valid instruments selected. Please try again.",
+                    action=INTENT_SELECTION
+                )
             
             # Update selected instruments
             self.selected_instruments = validated_instruments
@@ -216,37 +562,37 @@ class ToolBasedAgent:
             # Format response
             response = self._format_selection_results(validated_instruments)
             
-            return {
-                'success': True,
-                'response': response,
-                'action': 'selection',
-                'selected_instruments': validated_instruments,
-                'phase': self.current_phase
-            }
+            return AgentResponse(
+                success=True,
+                response=response,
+                action=INTENT_SELECTION,
+                selected_instruments=validated_instruments,
+                phase=self.current_phase
+            )
             
         except Exception as e:
             logger.error(f"Error in selection: {str(e)}")
-            return {
-                'success': False,
-                'response': f"Error processing selection: {str(e)}",
-                'action': 'selection',
-                'error': str(e)
-            }
+            return AgentResponse(
+                success=False,
+                response=f"Error processing selection: {str(e)}",
+                action=INTENT_SELECTION,
+                error=str(e)
+            )
     
-    def _handle_data_collection_intent(self, intent: Dict) -> Dict:
+    def _handle_data_collection_intent(self, intent: Dict) -> AgentResponse:
         """Handle data collection intent using the data collection tool."""
         logger.info("Handling data collection intent")
         
         if not self.selected_instruments:
-            return {
-                'success': False,
-                'response': "No instruments selected. Please search and select instruments first.",
-                'action': 'data_collection'
-            }
+            return AgentResponse(
+                success=False,
+                response="No instruments selected. Please search and select instruments first.",
+                action=INTENT_DATA_COLLECTION
+            )
         
         try:
             # Use the data collection tool
-            collection_results = self.available_tools['fetch_multiple_instruments'](
+            collection_results = self._tools()['fetch_multiple_instruments'](
                 instruments=self.selected_instruments,
                 days_back=30
             )
@@ -254,24 +600,24 @@ class ToolBasedAgent:
             # Format response
             response = self._format_data_collection_results(collection_results)
             
-            return {
-                'success': True,
-                'response': response,
-                'action': 'data_collection',
-                'results': collection_results,
-                'phase': self.current_phase
-            }
+            return AgentResponse(
+                success=True,
+                response=response,
+                action=INTENT_DATA_COLLECTION,
+                results=collection_results,
+                phase=self.current_phase
+            )
             
         except Exception as e:
             logger.error(f"Error in data collection: {str(e)}")
-            return {
-                'success': False,
-                'response': f"Error collecting data: {str(e)}",
-                'action': 'data_collection',
-                'error': str(e)
-            }
+            return AgentResponse(
+                success=False,
+                response=f"Error collecting data: {str(e)}",
+                action=INTENT_DATA_COLLECTION,
+                error=str(e)
+            )
     
-    def _handle_reset_intent(self) -> Dict:
+    def _handle_reset_intent(self) -> AgentResponse:
         """Handle reset intent."""
         logger.info("Handling reset intent")
         
@@ -280,63 +626,63 @@ class ToolBasedAgent:
         self.current_phase = "idle"
         self.last_search_results = []  # Clear search results too
         
-        return {
-            'success': True,
-            'response': "Workflow reset successfully. You can start a new analysis.",
-            'action': 'reset',
-            'phase': self.current_phase
-        }
+        return AgentResponse(
+            success=True,
+            response="Workflow reset successfully. You can start a new analysis.",
+            action=INTENT_RESET,
+            phase=self.current_phase
+        )
     
-    def _handle_unknown_intent(self, user_input: str) -> Dict:
+    def _handle_unknown_intent(self, user_input: str) -> AgentResponse:
         """Handle unknown intent."""
-        return {
-            'success': False,
-            'response': f"I'm not sure how to handle: '{user_input}'. Try asking me to search for instruments or select from results.",
-            'action': 'unknown'
-        }
+        return AgentResponse(
+            success=False,
+            response=f"I'm not sure how to handle: '{user_input}'. Try asking me to search for instruments or select from results.",
+            action=INTENT_UNKNOWN
+        )
     
-    def _validate_selection(self, selection: str) -> List[Dict]:
-        """Validate user selection against last search results."""
+    def _validate_selection(self, selection: str, selection_lower: Optional[str] = None) -> List[Dict]:
+        """
+        Validate user selection against last search results.
+        
+        Args:
+            selection: Raw selection text
+            selection_lower: Lowercased, stripped selection if already computed
+            
+        Returns:
+            List of selected instruments
+        """
+        # Stage 1: nothing to select from
         if not self.last_search_results:
             return []
         
-        # Handle number selections (1, 2, 3, etc.)
-        if selection.isdigit():
-            try:
-                index = int(selection) - 1  # Convert to 0-based index
-                if 0 <= index < len(self.last_search_results):
-                    return [self.last_search_results[index]]
-            except (ValueError, IndexError):
-                pass
-        
-        # Handle comma-separated numbers (1,3,5)
-        if ',' in selection:
-            try:
-                indices = [int(x.strip()) - 1 for x in selection.split(',')]
-                selected = []
-                for index in indices:
-                    if 0 <= index < len(self.last_search_results):
-                        selected.append(self.last_search_results[index])
+        # Stage 2: number selections (1 / 1,3,5 / 1 3 5), as 1-based indices;
+        # numbers that are all out of range may be instrument tokens, looked up below
+        if _INDEX_LIST_RE.match(selection):
+            count = len(self.last_search_results)
+            indices = [int(number) - 1 for number in _INT_TOKEN_RE.findall(selection)]
+            selected = [self.last_search_results[index] for index in indices if 0 <= index < count]
+            if selected:
                 return selected
-            except (ValueError, IndexError):
-                pass
         
-        # Handle symbol selections (NIFTY25AUGFUT, etc.)
-        selection_upper = selection.upper()
-        for instrument in self.last_search_results:
-            if (instrument['tradingsymbol'].upper() == selection_upper or 
-                instrument['name'].upper() == selection_upper):
-                return [instrument]
+        # Stage 3: symbol or name from the last search (NIFTY25AUGFUT, etc.)
+        if selection_lower is None:
+            selection_lower = selection.lower().strip()
+        instrument = self._symbol_index.get(selection_lower)
+        if instrument:
+            return [instrument]
         
-        # Try to get instrument details by symbol
+        # Stage 4: look the symbol up with the instrument details tool
+        instrument = self._lookup_instrument_details(selection.strip())
+        return [instrument] if instrument else []
+    
+    def _lookup_instrument_details(self, identifier: str) -> Optional[Dict]:
+        """Get instrument details by symbol or token, or None if the lookup fails."""
         try:
-            instrument = self.available_tools['get_instrument_details'](selection)
-            if instrument:
-                return [instrument]
-        except:
-            pass
-        
-        return []
+            return self._tools()['get_instrument_details'](identifier)
+        except Exception as e:
+            logger.warning(f"Instrument details lookup failed for {identifier}: {str(e)}")
+            return None
     
     def _format_search_results(self, search_results: Dict, original_input: str) -> str:
         """Format search results for user display."""
@@ -346,38 +692,29 @@ class ToolBasedAgent:
         if not results:
             return f"I couldn't find any instruments matching '{original_input}'. Please try a different search term."
         
-        response = f"I found {total_found} instruments related to '{original_input}'. Here are the top {len(results)} most relevant:\n\n"
+        parts = [f"I found {total_found} instruments related to '{original_input}'. Here are the top {len(results)} most relevant:\n\n"]
+        parts.extend(self._format_instrument_lines(results))
+        parts.append("Which instruments would you like to analyze? You can specify by number (e.g., '1,3') or by name (e.g., 'NIFTY, BANKNIFTY').")
         
-        for i, instrument in enumerate(results, 1):
-            name = instrument['name']
-            symbol = instrument['tradingsymbol']
-            exchange = instrument['exchange']
-            instrument_type = instrument['instrument_type']
-            
-            response += f"{i}. {name} ({symbol})\n"
-            response += f"   Exchange: {exchange} | Type: {instrument_type}\n\n"
-        
-        response += "Which instruments would you like to analyze? You can specify by number (e.g., '1,3') or by name (e.g., 'NIFTY, BANKNIFTY')."
-        
-        return response
+        return "".join(parts)
     
     def _format_selection_results(self, instruments: List[Dict]) -> str:
         """Format selection results for user display."""
-        response = f"Selected instruments for analysis:\n"
+        parts = ["Selected instruments for analysis:\n"]
+        parts.extend(self._format_instrument_lines(instruments))
+        parts.append("Phase 2: Data Collection - Ready!\n")
+        parts.append("You can now fetch historical data for pattern analysis.")
         
-        for i, instrument in enumerate(instruments, 1):
-            name = instrument['name']
-            symbol = instrument['tradingsymbol']
-            exchange = instrument['exchange']
-            instrument_type = instrument['instrument_type']
-            
-            response += f"{i}. {name} ({symbol})\n"
-            response += f"   Exchange: {exchange} | Type: {instrument_type}\n\n"
-        
-        response += "Phase 2: Data Collection - Ready!\n"
-        response += "You can now fetch historical data for pattern analysis."
-        
-        return response
+        return "".join(parts)
+    
+    @staticmethod
+    def _format_instrument_lines(instruments: List[Dict]) -> List[str]:
+        """Format a numbered entry per instrument for user display."""
+        return [
+            f"{i}. {instrument['name']} ({instrument['tradingsymbol']})\n"
+            f"   Exchange: {instrument['exchange']} | Type: {instrument['instrument_type']}\n\n"
+            for i, instrument in enumerate(instruments, 1)
+        ]
     
     def _format_data_collection_results(self, results: Dict) -> str:
         """Format data collection results for user display."""
@@ -398,11 +735,21 @@ class ToolBasedAgent:
     
     def get_status(self) -> Dict:
         """Get current agent status."""
-        return {
-            'current_phase': self.current_phase,
-            'selected_instruments': len(self.selected_instruments),
-            'conversation_length': len(self.conversation_history),
-            'last_search_results_count': len(self.last_search_results),
-            'available_tools': list(self.available_tools.keys()),
-            'timestamp': datetime.now().isoformat()
-        } 
\ No newline at end of file
+        state_key = (
+            self.current_phase,
+            len(self.selected_instruments),
+            len(self.conversation_history),
+            len(self.last_search_results)
+        )
+        # Rebuild the snapshot only when the agent state has changed
+        if state_key != self._status_key:
+            self._status_key = state_key
+            self._status_snapshot = {
+                'current_phase': self.current_phase,
+                'selected_instruments': len(self.selected_instruments),
+                'conversation_length': len(self.conversation_history),
+                'last_search_results_count': len(self.last_search_results),
+                'available_tools': list(_TOOL_NAMES)
+            }
+        
+        return {**self._status_snapshot, 'timestamp': _now_iso()}
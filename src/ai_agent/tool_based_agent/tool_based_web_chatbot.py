@@ -4,27 +4,105 @@ Tool-Based Web Chatbot
 A web interface for the tool-based AI agent.
 """
 import os
-import sys
+import gzip
+import json
+import hashlib
+import queue
+import atexit
+import shutil
+import subprocess
 import logging
-from flask import Flask, render_template_string, request, jsonify
-from datetime import datetime
-
-# Add src to path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from collections import OrderedDict
+from flask import Flask, Response, request, jsonify, stream_with_context
 
 from .tool_based_agent import ToolBasedAgent
 
-# Configure logging
+# orjson encodes responses much faster than the stdlib json behind jsonify
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Configure logging; records are queued and written to stderr by a background
+# thread so request handlers never block on the write
+_log_queue = queue.SimpleQueue()
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+
+def _start_log_listener():
+    """Start the thread that drains the log queue; forked workers need their own."""
+    global _log_listener
+    _log_listener = QueueListener(_log_queue, _log_stream_handler)
+    _log_listener.start()
+
+_start_log_listener()
+# Threads do not survive fork, so workers forked from a preloaded app restart it
+os.register_at_fork(after_in_child=_start_log_listener)
+atexit.register(lambda: _log_listener.stop())
+
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    handlers=[QueueHandler(_log_queue)]
 )
+# Per-request access lines from the dev server are not needed at INFO
+logging.getLogger('werkzeug').setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
-# Initialize the tool-based agent
-agent = ToolBasedAgent()
+# Request threads per worker when served by gunicorn
+GUNICORN_THREADS = 8
+
+# Seconds an idle browser connection is kept open for its next request
+KEEP_ALIVE_SECONDS = 75
+
+# Maximum number of per-session agents kept; the least recently used is evicted
+MAX_SESSION_AGENTS = 256
+
+# session_id -> (agent, lock serializing that session's turns)
+_session_agents = OrderedDict()
+_session_agents_lock = threading.Lock()
+
+def get_session_agent(session_id: str, create: bool = True):
+    """
+    Return the agent and lock for a chat session, creating them on first use.
+    
+    Args:
+        session_id: Identifier sent by the browser for its chat session
+        create: Whether to create the session if it does not exist
+        
+    Returns:
+        Tuple of (ToolBasedAgent, threading.Lock), or None for an unknown
+        session when create is False
+    """
+    with _session_agents_lock:
+        entry = _session_agents.get(session_id)
+        if entry is None:
+            if not create:
+                return None
+            entry = _session_agents[session_id] = (ToolBasedAgent(), threading.Lock())
+            if len(_session_agents) > MAX_SESSION_AGENTS:
+                _session_agents.popitem(last=False)
+        else:
+            _session_agents.move_to_end(session_id)
+        return entry
+
+# Agent for clients that do not send a session_id
+agent, _ = get_session_agent('default')
+
+# Never used for a turn; reports the status of sessions that have not chatted yet
+_idle_agent = ToolBasedAgent()
+
+def _warm_up():
+    """Import the agent's tools and prime the intent parser before the first request."""
+    try:
+        agent.warm_up()
+    except Exception as e:
+        logger.warning("Agent warm-up failed: %s", e)
+
+_warm_up()
 
 # HTML template for the web interface
 HTML_TEMPLATE = """
@@ -280,7 +358,7 @@ HTML_TEMPLATE = """
         <div class="chat-messages" id="chatMessages">
             <div class="message bot">
                 <div class="message-content">
-                    <div class="phase-indicator">Phase: {{ agent_status.current_phase }}</div>
+                    <div class="phase-indicator">Phase: idle</div>
                     <p>Hello! I'm your AI instrument analysis assistant. I can help you:</p>
                     <ul style="margin-left: 20px; margin-top: 10px;">
                         <li>🔍 Search for financial instruments</li>
@@ -289,7 +367,7 @@ HTML_TEMPLATE = """
                         <li>🛠️ Use specialized tools for each task</li>
                     </ul>
                     <p style="margin-top: 15px;"><strong>Try asking:</strong> "Show me NIFTY futures" or "Find BANKNIFTY options"</p>
-                    <div class="tool-info">Available Tools: {{ ', '.join(agent_status.available_tools) }}</div>
+                    <div class="tool-info">Available Tools: </div>
                 </div>
             </div>
         </div>
@@ -317,6 +395,7 @@ HTML_TEMPLATE = """
         const messageInput = document.getElementById('messageInput');
         const sendBtn = document.getElementById('sendBtn');
         const chatForm = document.getElementById('chatForm');
+        const sessionId = 'session_' + Date.now() + '_' + Math.random().toString(36).slice(2);
         
         function addMessage(content, isUser = false) {
             const messageDiv = document.createElement('div');
@@ -357,6 +436,47 @@ HTML_TEMPLATE = """
             }
         }
         
+        const ACTION_LABELS = {
+            search: 'Searching instruments...',
+            selection: 'Validating selection...',
+            data_collection: 'Fetching historical data...',
+            reset: 'Resetting workflow...'
+        };
+        
+        // Read server-sent events from /api/chat/stream until the result arrives
+        async function readChatStream(response) {
+            if (!response.headers.get('Content-Type').startsWith('text/event-stream')) {
+                return response.json();
+            }
+            
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                
+                let boundary;
+                while ((boundary = buffer.indexOf('\\n\\n')) !== -1) {
+                    const frame = buffer.slice(0, boundary);
+                    buffer = buffer.slice(boundary + 2);
+                    if (!frame.startsWith('data: ')) continue;
+                    
+                    const event = JSON.parse(frame.slice(6));
+                    if (event.event === 'result') {
+                        return event.result;
+                    }
+                    const typingIndicator = document.querySelector('#typingIndicator .typing-indicator');
+                    if (typingIndicator && ACTION_LABELS[event.action]) {
+                        typingIndicator.textContent = ACTION_LABELS[event.action];
+                    }
+                }
+            }
+            throw new Error('Connection closed before a response was received');
+        }
+        
         function sendQuickAction(action) {
             messageInput.value = action;
             sendMessage();
@@ -375,15 +495,15 @@ HTML_TEMPLATE = """
             showTypingIndicator();
             
             try {
-                const response = await fetch('/api/chat', {
+                const response = await fetch('/api/chat/stream', {
                     method: 'POST',
                     headers: {
                         'Content-Type': 'application/json',
                     },
-                    body: JSON.stringify({ message: message })
+                    body: JSON.stringify({ message: message, session_id: sessionId })
                 });
                 
-                const data = await response.json();
+                const data = await readChatStream(response);
                 hideTypingIndicator();
                 
                 if (data.success) {
@@ -421,6 +541,15 @@ HTML_TEMPLATE = """
             }
         });
         
+        // Fill in the live agent status; the page itself is static and cacheable
+        fetch(`/api/status?session_id=${encodeURIComponent(sessionId)}`)
+            .then(response => response.json())
+            .then(status => {
+                document.querySelector('.phase-indicator').textContent = `Phase: ${status.current_phase}`;
+                document.querySelector('.tool-info').textContent = `Available Tools: ${status.available_tools.join(', ')}`;
+            })
+            .catch(() => {});
+        
         // Auto-focus input
         messageInput.focus();
     </script>
@@ -428,11 +557,41 @@ HTML_TEMPLATE = """
 </html>
 """
 
+# The page has no server-side placeholders, so it is encoded and compressed once
+INDEX_BODY = HTML_TEMPLATE.encode('utf-8')
+INDEX_BODY_GZIP = gzip.compress(INDEX_BODY, compresslevel=9, mtime=0)
+INDEX_ETAG = hashlib.blake2b(INDEX_BODY, digest_size=8).hexdigest()
+
+# How long browsers may reuse the page without revalidating, in seconds
+INDEX_MAX_AGE = 3600
+
+def dump_json(payload: dict) -> bytes:
+    """Serialize a payload to UTF-8 JSON, using orjson when installed."""
+    if orjson is None:
+        return json.dumps(payload, default=str).encode('utf-8')
+    return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+def json_response(payload: dict) -> Response:
+    """Serialize a payload to a JSON response, using orjson when installed."""
+    if orjson is None:
+        return jsonify(payload)
+    return Response(dump_json(payload), mimetype='application/json')
+
 @app.route('/')
 def index():
-    """Render the main chat interface."""
-    agent_status = agent.get_status()
-    return render_template_string(HTML_TEMPLATE, agent_status=agent_status)
+    """Serve the main chat interface."""
+    # The bodies are already bytes, so Werkzeug can hand them to the server as-is
+    if 'gzip' in request.accept_encodings:
+        response = Response(INDEX_BODY_GZIP, mimetype='text/html', direct_passthrough=True)
+        response.headers['Content-Encoding'] = 'gzip'
+        response.set_etag(INDEX_ETAG + '-gz')
+    else:
+        response = Response(INDEX_BODY, mimetype='text/html', direct_passthrough=True)
+        response.set_etag(INDEX_ETAG)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.max_age = INDEX_MAX_AGE
+    return response.make_conditional(request)
 
 @app.route('/api/chat', methods=['POST'])
 def chat():
@@ -442,29 +601,88 @@ def chat():
         message = data.get('message', '').strip()
         
         if not message:
-            return jsonify({
+            return json_response({
                 'success': False,
                 'response': 'Please provide a message.'
             })
         
-        logger.info(f"Received message: {message}")
+        session_id = data.get('session_id', 'default')
+        logger.info("Received message: %s", message)
         
-        # Process message with the tool-based agent
-        result = agent.process_user_input(message)
+        # Process message with the session's tool-based agent
+        session_agent, session_lock = get_session_agent(session_id)
+        with session_lock:
+            result = session_agent.process_user_input(message)
         
-        return jsonify(result)
+        return json_response(result)
         
     except Exception as e:
-        logger.error(f"Error processing chat message: {str(e)}")
-        return jsonify({
+        logger.error("Error processing chat message: %s", e)
+        return json_response({
             'success': False,
             'response': f'Error processing message: {str(e)}'
         })
 
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Handle chat messages, streaming agent progress as server-sent events."""
+    try:
+        data = request.get_json()
+        message = data.get('message', '').strip()
+        
+        if not message:
+            return json_response({
+                'success': False,
+                'response': 'Please provide a message.'
+            })
+        
+        session_id = data.get('session_id', 'default')
+        logger.info("Received streamed message: %s", message)
+        
+        session_agent, session_lock = get_session_agent(session_id)
+        
+    except Exception as e:
+        logger.error("Error processing chat message: %s", e)
+        return json_response({
+            'success': False,
+            'response': f'Error processing message: {str(e)}'
+        })
+    
+    def generate():
+        try:
+            with session_lock:
+                for event in session_agent.process_user_input_stream(message):
+                    yield b'data: ' + dump_json(event) + b'\n\n'
+        except Exception as e:
+            logger.error("Error processing chat message: %s", e)
+            yield b'data: ' + dump_json({
+                'event': 'result',
+                'result': {
+                    'success': False,
+                    'response': f'Error processing message: {str(e)}'
+                }
+            }) + b'\n\n'
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/api/status')
 def status():
-    """Get agent status."""
-    return jsonify(agent.get_status())
+    """Get agent status; polls made while the state is unchanged get a bodiless 304."""
+    # Status reads never create sessions, so polling cannot evict active ones
+    entry = get_session_agent(request.args.get('session_id', 'default'), create=False)
+    session_agent = entry[0] if entry else _idle_agent
+    # A re-created agent restarts its version, so the tag also names the agent
+    etag = f'{session_agent.instance_id}-{session_agent.state_version}'
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers={'ETag': f'"{etag}"', 'Cache-Control': 'no-cache'})
+    
+    response = json_response(session_agent.get_status())
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
 
 if __name__ == '__main__':
     print("🤖 Starting Tool-Based AI Instrument Analysis Chatbot...")
@@ -472,4 +690,16 @@ if __name__ == '__main__':
     print("📱 Modern web interface with tool-based AI architecture")
     print("🔄 Press Ctrl+C to stop the server")
     
-    app.run(host='127.0.0.1', port=5002, debug=False) 
\ No newline at end of file
+    if shutil.which('gunicorn'):
+        # Chat sessions live in this process's memory, so a single preloaded worker
+        # serves every session and its threads provide the concurrency
+        src_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        subprocess.run([
+            'gunicorn', '-w', '1', '-k', 'gthread', '--threads', str(GUNICORN_THREADS),
+            '--keep-alive', str(KEEP_ALIVE_SECONDS),
+            '--preload', '-b', '127.0.0.1:5002', '--pythonpath', src_dir,
+            'ai_agent.tool_based_agent.tool_based_web_chatbot:app'
+        ])
+    else:
+        # One thread per request, so a chat waiting on a tool call does not block other clients
+        app.run(host='127.0.0.1', port=5002, debug=False, threaded=True, use_reloader=False) 
\ No newline at end of file
@@ -4,17 +4,30 @@ Enhanced Tool-Based Web Chatbot with Detailed Logging
 A web interface for the tool-based AI agent with comprehensive logging.
 """
 import os
-import sys
 import json
+import queue
+import atexit
 import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime
-from flask import Flask, render_template_string, request, jsonify
-
-# Add src to path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from flask import Flask, Response, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 
 from .tool_based_agent import ToolBasedAgent
 
+# gunicorn serves the app when installed; otherwise the Flask server is used
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:
+    BaseApplication = None
+
+# orjson is much faster than stdlib json for both responses and log lines
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Configure comprehensive logging
 log_dir = 'logs'
 os.makedirs(log_dir, exist_ok=True)
@@ -22,35 +35,112 @@ os.makedirs(log_dir, exist_ok=True)
 # Create a detailed log file for web interactions
 log_file = os.path.join(log_dir, f'web_chatbot_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log')
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_file),
-        logging.StreamHandler()
-    ]
-)
+# Request threads only enqueue records; a background listener writes them to disk and stderr
+_log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+_log_file_handler = logging.FileHandler(log_file)
+_log_file_handler.setFormatter(_log_formatter)
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(_log_formatter)
+_log_queue = queue.SimpleQueue()
+
+# The queue handler is added to the root logger directly rather than through basicConfig,
+# which would do nothing if another module (such as the basic chatbot) configured logging
+# first; stderr is only added when nothing else already writes there
+_root_logger = logging.getLogger()
+if _root_logger.handlers:
+    _log_handlers = (_log_file_handler,)
+else:
+    _log_handlers = (_log_file_handler, _log_stream_handler)
+
+def _start_log_listener():
+    """Start the thread that drains the log queue; forked workers need their own."""
+    global _log_listener
+    _log_listener = QueueListener(_log_queue, *_log_handlers)
+    _log_listener.start()
+
+_start_log_listener()
+# Threads do not survive fork, so workers forked from a preloaded app restart it
+os.register_at_fork(after_in_child=_start_log_listener)
+atexit.register(lambda: _log_listener.stop())
+_root_logger.addHandler(QueueHandler(_log_queue))
+_root_logger.setLevel(logging.INFO)
 logger = logging.getLogger(__name__)
 
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that delegates to orjson when it is installed."""
+    
+    def dumps(self, obj, **kwargs):
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(
+            obj, default=str, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        ).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        if orjson is None:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+def dump_log_json(obj) -> str:
+    """Pretty-print an object as JSON for the interaction log."""
+    if orjson is None:
+        return json.dumps(obj, indent=2, default=str)
+    return orjson.dumps(
+        obj, default=str,
+        option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    ).decode('utf-8')
+
+class LazyJSON:
+    """Defers pretty-printing an object until a log handler formats the record."""
+    
+    __slots__ = ('obj',)
+    
+    def __init__(self, obj):
+        self.obj = obj
+    
+    def __str__(self) -> str:
+        return dump_log_json(self.obj)
+
+# Number of trailing log characters returned by /api/logs
+LOG_TAIL_CHARS = 5000
+
+# gunicorn settings; the agent's state lives in this process, so one worker
+# serves every chat and its threads provide the concurrency
+GUNICORN_OPTIONS = {
+    'bind': '127.0.0.1:5003',
+    'workers': 1,
+    'worker_class': 'gthread',
+    'threads': 8,
+    'keepalive': 75,
+    'preload_app': True
+}
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 
 # Initialize the tool-based agent
 agent = ToolBasedAgent()
+# The server's threads share one agent, so turns, resets and status reads take turns
+agent_lock = threading.Lock()
 
 def log_web_interaction(user_input: str, response: dict, session_id: str = None):
-    """Log web interactions with detailed information."""
+    """Log web interactions with detailed information; call with agent_lock held."""
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    
+    agent_status = agent.get_status()
     log_entry = {
         'timestamp': datetime.now().isoformat(),
         'session_id': session_id or 'default',
         'user_input': user_input,
         'agent_response': response,
-        'agent_status': agent.get_status()
+        'agent_status': agent_status
     }
     
-    logger.info(f"=== WEB INTERACTION ===")
-    logger.info(f"User Input: {user_input}")
-    logger.info(f"Agent Response: {json.dumps(response, indent=2, default=str)}")
-    logger.info(f"Agent Status: {json.dumps(agent.get_status(), indent=2, default=str)}")
+    logger.info("=== WEB INTERACTION ===")
+    logger.info("User Input: %s", user_input)
+    logger.info("Agent Response: %s", LazyJSON(response))
+    logger.info("Agent Status: %s", LazyJSON(agent_status))
     logger.info("=" * 50)
 
 # HTML template for the web interface
@@ -396,12 +486,17 @@ HTML_TEMPLATE = """
             }
         }
         
+        // Quick actions with a dedicated endpoint skip the chat message parsing
+        const QUICK_ACTION_ENDPOINTS = {
+            'Reset workflow': '/api/reset'
+        };
+        
         function sendQuickAction(action) {
             messageInput.value = action;
-            sendMessage();
+            sendMessage(QUICK_ACTION_ENDPOINTS[action]);
         }
         
-        async function sendMessage() {
+        async function sendMessage(endpoint = '/api/chat') {
             const message = messageInput.value.trim();
             if (!message) return;
             
@@ -414,7 +509,7 @@ HTML_TEMPLATE = """
             showTypingIndicator();
             
             try {
-                const response = await fetch('/api/chat', {
+                const response = await fetch(endpoint, {
                     method: 'POST',
                     headers: {
                         'Content-Type': 'application/json',
@@ -467,20 +562,32 @@ HTML_TEMPLATE = """
 </html>
 """
 
+# Compiled once at import; rendered pages are cached per template inputs
+INDEX_TEMPLATE = app.jinja_env.from_string(HTML_TEMPLATE)
+_rendered_index = {}
+
+def render_index(agent_status: dict) -> str:
+    """Return the rendered chat page for the given agent status."""
+    key = (agent_status['current_phase'], tuple(agent_status['available_tools']))
+    page = _rendered_index.get(key)
+    if page is None:
+        page = _rendered_index[key] = INDEX_TEMPLATE.render(agent_status=agent_status, log_file=log_file)
+    return page
+
 @app.route('/')
 def index():
     """Render the main chat interface."""
-    agent_status = agent.get_status()
-    return render_template_string(HTML_TEMPLATE, 
-                                agent_status=agent_status,
-                                log_file=log_file)
+    with agent_lock:
+        agent_status = agent.get_status()
+    return render_index(agent_status)
 
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """Handle chat messages with detailed logging."""
     try:
         data = request.get_json()
-        message = data.get('message', '').strip()
+        # Collapse whitespace so equivalent messages share the agent's parse and search caches
+        message = ' '.join(data.get('message', '').split())
         
         if not message:
             return jsonify({
@@ -488,39 +595,61 @@ def chat():
                 'response': 'Please provide a message.'
             })
         
-        logger.info(f"Received web message: {message}")
+        logger.info("Received web message: %s", message)
         
-        # Process message with the tool-based agent
-        result = agent.process_user_input(message)
-        
-        # Log the interaction
-        log_web_interaction(message, result)
+        with agent_lock:
+            # Process message with the tool-based agent
+            result = agent.process_user_input(message)
+            
+            # Log the interaction
+            log_web_interaction(message, result)
         
         return jsonify(result)
         
     except Exception as e:
-        logger.error(f"Error processing web chat message: {str(e)}")
+        logger.error("Error processing web chat message: %s", e)
         error_response = {
             'success': False,
             'response': f'Error processing message: {str(e)}'
         }
-        log_web_interaction(message if 'message' in locals() else 'unknown', error_response)
+        with agent_lock:
+            log_web_interaction(message if 'message' in locals() else 'unknown', error_response)
         return jsonify(error_response)
 
+@app.route('/api/reset', methods=['POST'])
+def reset():
+    """Reset the agent's workflow without going through chat message parsing."""
+    with agent_lock:
+        result = agent.reset()
+        log_web_interaction('Reset workflow', result)
+    return jsonify(result)
+
 @app.route('/api/status')
 def status():
-    """Get agent status."""
-    return jsonify(agent.get_status())
+    """Get agent status; polls made while the state is unchanged get a bodiless 304."""
+    with agent_lock:
+        etag = str(agent.state_version)
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers={'ETag': f'"{etag}"', 'Cache-Control': 'no-cache'})
+        agent_status = agent.get_status()
+    
+    response = jsonify(agent_status)
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
 
 @app.route('/api/logs')
 def get_logs():
     """Get recent logs for debugging."""
     try:
-        with open(log_file, 'r') as f:
-            logs = f.read()
+        # Read only the end of the file; a UTF-8 character is at most 4 bytes
+        with open(log_file, 'rb') as f:
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(0, size - LOG_TAIL_CHARS * 4))
+            logs = f.read().decode('utf-8', errors='replace')
         return jsonify({
             'success': True,
-            'logs': logs[-5000:]  # Last 5000 characters
+            'logs': logs[-LOG_TAIL_CHARS:]
         })
     except Exception as e:
         return jsonify({
@@ -535,4 +664,17 @@ if __name__ == '__main__':
     print("📱 Enhanced web interface with comprehensive logging")
     print("🔄 Press Ctrl+C to stop the server")
     
-    app.run(host='127.0.0.1', port=5003, debug=False) 
\ No newline at end of file
+    if BaseApplication is not None:
+        class ChatbotServer(BaseApplication):
+            """Runs the already-imported app under gunicorn, so the log file above stays in use."""
+            
+            def load_config(self):
+                for key, value in GUNICORN_OPTIONS.items():
+                    self.cfg.set(key, value)
+            
+            def load(self):
+                return app
+        
+        ChatbotServer().run()
+    else:
+        app.run(host='127.0.0.1', port=5003, debug=False, threaded=True) 
\ No newline at end of file
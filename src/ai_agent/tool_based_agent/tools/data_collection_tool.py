@@ -4,18 +4,61 @@ Data Collection Tool
 A tool for fetching historical candle data for instruments.
 """
 import os
-import sys
+import time
 import logging
-from typing import List, Dict, Optional
+import threading
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
 
-# Add src to path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
-
-from src.data_fetcher import KiteConnectDataFetcher
+# src/ is importable as a package from the repo root, or is itself on the path
+# when the chatbots are launched from inside it
+try:
+    from src.data_fetcher import KiteConnectDataFetcher
+except ImportError:
+    from data_fetcher import KiteConnectDataFetcher
 
 logger = logging.getLogger(__name__)
 
+# Replaces spaces in instrument names used in filenames
+_SPACE_TO_UNDERSCORE = str.maketrans(' ', '_')
+
+# Length of the "_YYYYmmdd_HHMMSS.csv" ending of a descriptive data filename
+_TIMESTAMP_SUFFIX_LENGTH = len('_20250101_000000.csv')
+
+# Kite Connect allows 3 historical data requests per second
+KITE_HISTORICAL_REQUESTS_PER_SECOND = 3
+
+# Maximum number of instruments fetched concurrently
+MAX_FETCH_WORKERS = 16
+
+# Number of data directories whose tools are kept by the tool functions
+TOOL_CACHE_SIZE = 4
+
+class RateLimiter:
+    """
+    Spaces calls evenly so they never exceed a given rate, across threads.
+    """
+    
+    def __init__(self, calls_per_second: float):
+        """Initialize the limiter for the given number of calls per second."""
+        self.interval = 1.0 / calls_per_second
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+    
+    def wait(self):
+        """Block until the caller may make its next call."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+# Shared by every tool instance, since the limit applies to the whole API key
+_kite_rate_limiter = RateLimiter(KITE_HISTORICAL_REQUESTS_PER_SECOND)
+
 class DataCollectionTool:
     """
     Tool for collecting historical candle data.
@@ -24,11 +67,24 @@ class DataCollectionTool:
     def __init__(self, data_dir: str = "data"):
         """Initialize the data collection tool."""
         self.data_dir = data_dir
+        self._data_dir_prefix = os.path.join(data_dir, '')
         os.makedirs(data_dir, exist_ok=True)
+        self._fetcher = None
+        self._fetcher_lock = threading.Lock()
+    
+    @property
+    def fetcher(self) -> KiteConnectDataFetcher:
+        """Data fetcher shared by all fetches made with this tool, created on first use."""
+        if self._fetcher is None:
+            with self._fetcher_lock:
+                if self._fetcher is None:
+                    self._fetcher = KiteConnectDataFetcher()
+        return self._fetcher
     
     def fetch_instrument_data(self, instrument: Dict, 
                              days_back: int = 30,
-                             save_data: bool = True) -> Dict:
+                             save_data: bool = True,
+                             date_range: Optional[Tuple[str, str]] = None) -> Dict:
         """
         Fetch historical data for a single instrument.
         
@@ -36,53 +92,56 @@ class DataCollectionTool:
             instrument: Instrument dictionary with details
             days_back: Number of days of historical data to fetch
             save_data: Whether to save data to file
+            date_range: Precomputed (start, end) dates as 'YYYY-MM-DD' strings;
+                derived from days_back when not given
             
         Returns:
             Dictionary with fetch results and metadata
         """
+        # One clock read serves the date range, the filename and the fetch time
+        now = datetime.now()
+        fetch_time = now.isoformat()
+        
         try:
             logger.info(f"Fetching data for {instrument['tradingsymbol']}")
             
             # Calculate date range
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=days_back)
+            start_str, end_str = date_range or self._date_range(days_back, now)
+            
+            # Save straight to a descriptive filename rather than renaming afterwards
+            file_path = None
+            if save_data:
+                file_path = self._data_dir_prefix + self._generate_descriptive_filename(instrument, now)
             
             # Fetch data using existing data_fetcher
-            fetcher = KiteConnectDataFetcher()
+            fetcher = self.fetcher
+            _kite_rate_limiter.wait()
             df = fetcher.get_historical_data_for_instrument(
                 instrument_token=instrument['instrument_token'],
-                from_date=start_date.strftime('%Y-%m-%d'),
-                to_date=end_date.strftime('%Y-%m-%d'),
+                from_date=start_str,
+                to_date=end_str,
                 interval='day',
                 save_csv=save_data,
-                instrument_name=instrument['tradingsymbol']
+                instrument_name=instrument['tradingsymbol'],
+                csv_filename=file_path
             )
             
+            # The fetcher only writes a file when data came back
             result = {
                 'data_points': len(df),
-                'file_path': None
+                'file_path': file_path if len(df) else None
             }
             
-            # Generate descriptive filename
-            if save_data and result.get('file_path'):
-                descriptive_filename = self._generate_descriptive_filename(instrument)
-                new_file_path = os.path.join(self.data_dir, descriptive_filename)
-                
-                # Rename the file to be more descriptive
-                if os.path.exists(result['file_path']):
-                    os.rename(result['file_path'], new_file_path)
-                    result['file_path'] = new_file_path
-            
             return {
                 'success': True,
                 'instrument': instrument,
                 'data_points': result.get('data_points', 0),
                 'file_path': result.get('file_path'),
                 'date_range': {
-                    'start': start_date.strftime('%Y-%m-%d'),
-                    'end': end_date.strftime('%Y-%m-%d')
+                    'start': start_str,
+                    'end': end_str
                 },
-                'fetch_time': datetime.now().isoformat()
+                'fetch_time': fetch_time
             }
             
         except Exception as e:
@@ -91,51 +150,93 @@ class DataCollectionTool:
                 'success': False,
                 'instrument': instrument,
                 'error': str(e),
-                'fetch_time': datetime.now().isoformat()
+                'fetch_time': fetch_time
             }
     
     def fetch_multiple_instruments(self, instruments: List[Dict], 
-                                  days_back: int = 30) -> Dict:
+                                  days_back: int = 30,
+                                  detail: bool = True) -> Dict:
         """
         Fetch data for multiple instruments.
         
         Args:
             instruments: List of instrument dictionaries
             days_back: Number of days of historical data to fetch
+            detail: Whether to keep every per-instrument result; when False only
+                the counts and the symbols of failed instruments are returned
             
         Returns:
             Dictionary with results for all instruments
         """
         logger.info(f"Fetching data for {len(instruments)} instruments")
         
+        now = datetime.now()
         results = {
             'total_instruments': len(instruments),
             'successful_fetches': 0,
             'failed_fetches': 0,
             'results': [],
-            'fetch_time': datetime.now().isoformat()
+            'fetch_time': now.isoformat()
         }
         
+        if not detail:
+            del results['results']
+            results['failed_instruments'] = []
+        
+        if not instruments:
+            return results
+        
+        # Every instrument in the batch uses the same date range
+        date_range = self._date_range(days_back, now)
+        
+        # Kite has no multi-instrument historical endpoint, so the only requests that can
+        # be merged are repeats: fetch each instrument token once per batch
+        unique_instruments = {}
         for instrument in instruments:
-            result = self.fetch_instrument_data(instrument, days_back)
-            results['results'].append(result)
-            
+            unique_instruments.setdefault(instrument.get('instrument_token', id(instrument)), instrument)
+        
+        # Each fetch waits on the network, so fetch concurrently
+        with ThreadPoolExecutor(max_workers=min(MAX_FETCH_WORKERS, len(unique_instruments))) as executor:
+            fetched = dict(zip(unique_instruments, executor.map(
+                lambda instrument: self.fetch_instrument_data(instrument, days_back, date_range=date_range),
+                unique_instruments.values()
+            )))
+        
+        # Results keep input order, repeats sharing their instrument's result
+        for instrument in instruments:
+            result = fetched[instrument.get('instrument_token', id(instrument))]
             if result['success']:
                 results['successful_fetches'] += 1
             else:
                 results['failed_fetches'] += 1
+                if not detail:
+                    results['failed_instruments'].append(result['instrument']['tradingsymbol'])
+            if detail:
+                results['results'].append(result)
         
         return results
     
-    def _generate_descriptive_filename(self, instrument: Dict) -> str:
-        """Generate a descriptive filename for the instrument data."""
-        symbol = instrument['tradingsymbol']
-        name = instrument['name'].replace(' ', '_')
-        exchange = instrument['exchange']
-        instrument_type = instrument['instrument_type']
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        
-        return f"{symbol}_{name}_{exchange}_{instrument_type}_{timestamp}.csv"
+    @staticmethod
+    def _date_range(days_back: int, end_date: Optional[datetime] = None) -> Tuple[str, str]:
+        """Return the (start, end) dates covering the days_back days up to end_date (default now)."""
+        end_date = end_date or datetime.now()
+        start_date = end_date - timedelta(days=days_back)
+        return start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')
+    
+    def _generate_descriptive_filename(self, instrument: Dict, timestamp: Optional[datetime] = None) -> str:
+        """Generate a descriptive filename for the instrument data, stamped with timestamp (default now)."""
+        return (self._filename_prefix(instrument) + '_'
+                + (timestamp or datetime.now()).strftime('%Y%m%d_%H%M%S') + '.csv')
+    
+    @staticmethod
+    def _filename_prefix(instrument: Dict) -> str:
+        """Return the part of an instrument's data filename that precedes the timestamp."""
+        return '_'.join((
+            instrument['tradingsymbol'],
+            instrument['name'].translate(_SPACE_TO_UNDERSCORE),
+            instrument['exchange'],
+            instrument['instrument_type']
+        ))
     
     def get_data_summary(self, instruments: List[Dict]) -> Dict:
         """
@@ -154,21 +255,38 @@ class DataCollectionTool:
             'summary_time': datetime.now().isoformat()
         }
         
+        # List the data directory once, keeping each data file's name without its timestamp
+        with os.scandir(self.data_dir) as entries:
+            saved_prefixes = {
+                entry.name[:-_TIMESTAMP_SUFFIX_LENGTH] for entry in entries
+                if entry.name.endswith('.csv') and entry.is_file()
+            }
+        
         for instrument in instruments:
-            symbol = instrument['tradingsymbol']
-            name = instrument['name']
-            
-            # Check if data file exists (simplified check)
-            # In a real implementation, you'd check the actual data files
-            summary['data_available'].append({
-                'symbol': symbol,
-                'name': name,
-                'status': 'available'  # Placeholder
+            available = self._filename_prefix(instrument) in saved_prefixes
+            summary['data_available' if available else 'data_missing'].append({
+                'symbol': instrument['tradingsymbol'],
+                'name': instrument['name'],
+                'status': 'available' if available else 'missing'
             })
         
         return summary
 
 # Tool functions for the AI agent
+@lru_cache(maxsize=TOOL_CACHE_SIZE)
+def get_data_collection_tool(data_dir: str = "data") -> DataCollectionTool:
+    """
+    Get the data collection tool for a data directory, creating it only once.
+    
+    Args:
+        data_dir: Directory the fetched data is saved to
+        
+    Returns:
+        Tool shared with other callers of the same directory, so its fetcher
+        and connection pool last across agent turns
+    """
+    return DataCollectionTool(data_dir)
+
 def fetch_instrument_data_tool(instrument: Dict, days_back: int = 30) -> Dict:
     """
     Tool function for fetching instrument data.
@@ -180,7 +298,7 @@ def fetch_instrument_data_tool(instrument: Dict, days_back: int = 30) -> Dict:
     Returns:
         Fetch results dictionary
     """
-    tool = DataCollectionTool()
+    tool = get_data_collection_tool()
     return tool.fetch_instrument_data(instrument, days_back)
 
 def fetch_multiple_instruments_tool(instruments: List[Dict], days_back: int = 30) -> Dict:
@@ -194,7 +312,7 @@ def fetch_multiple_instruments_tool(instruments: List[Dict], days_back: int = 30
     Returns:
         Fetch results dictionary
     """
-    tool = DataCollectionTool()
+    tool = get_data_collection_tool()
     return tool.fetch_multiple_instruments(instruments, days_back)
 
 def get_data_summary_tool(instruments: List[Dict]) -> Dict:
@@ -207,5 +325,5 @@ def get_data_summary_tool(instruments: List[Dict]) -> Dict:
     Returns:
         Summary dictionary
     """
-    tool = DataCollectionTool()
+    tool = get_data_collection_tool()
     return tool.get_data_summary(instruments) 
\ No newline at end of file
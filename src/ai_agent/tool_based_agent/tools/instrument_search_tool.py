@@ -3,9 +3,11 @@
 Instrument Search Tool
 A tool for searching and discovering financial instruments.
 """
+import os
 import pandas as pd
 import re
 import logging
+from functools import lru_cache
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 import numpy as np
@@ -14,6 +16,19 @@ logger = logging.getLogger(__name__)
 
 DEFAULT_CSV_PATH = "data/instruments_list_20250705_093603.csv"
 
+# Low-cardinality columns stored as categoricals
+CATEGORY_COLUMNS = ('exchange', 'instrument_type', 'segment')
+
+# Fields returned for an instrument, and for a search result
+DETAIL_COLUMNS = [
+    'instrument_token', 'tradingsymbol', 'name', 'exchange', 'instrument_type',
+    'segment', 'expiry', 'strike', 'lot_size', 'tick_size'
+]
+RESULT_COLUMNS = DETAIL_COLUMNS + ['relevance_score']
+
+# Number of instrument files kept loaded by the tool functions
+TOOL_CACHE_SIZE = 4
+
 class InstrumentSearchTool:
     """
     Tool for searching financial instruments.
@@ -23,6 +38,10 @@ class InstrumentSearchTool:
         """Initialize the instrument search tool."""
         self.instruments_csv_path = instruments_csv_path or DEFAULT_CSV_PATH
         self.instruments_df = None
+        self._by_token = {}  # instrument_token -> row position
+        self._by_symbol_lower = {}  # lowercased tradingsymbol -> row position
+        self._unique_names = None  # Distinct lowercased names
+        self._name_codes = None  # Position of each row's name in _unique_names
         self.load_instruments_data()
     
     def load_instruments_data(self):
@@ -35,6 +54,28 @@ class InstrumentSearchTool:
             self.instruments_df['name'] = self.instruments_df['name'].fillna('')
             self.instruments_df['tradingsymbol'] = self.instruments_df['tradingsymbol'].fillna('')
             
+            # Lowercased copies used by matching, scoring and symbol lookups
+            self.instruments_df['_name_lower'] = self.instruments_df['name'].astype(str).str.lower()
+            self.instruments_df['_symbol_lower'] = self.instruments_df['tradingsymbol'].astype(str).str.lower()
+            
+            # Derivative contracts repeat their underlying's name, so name matching
+            # scans each distinct name once and maps the result back to the rows
+            self._name_codes, unique_names = pd.factorize(self.instruments_df['_name_lower'])
+            self._unique_names = pd.Series(unique_names)
+            
+            # A handful of distinct values each, so filters compare integer codes
+            for column in CATEGORY_COLUMNS:
+                self.instruments_df[column] = self.instruments_df[column].astype('category')
+            
+            # Lookup indexes; built from the reversed rows so the first duplicate wins
+            positions = range(len(self.instruments_df) - 1, -1, -1)
+            self._by_token = dict(zip(
+                self.instruments_df['instrument_token'].tolist()[::-1], positions
+            ))
+            self._by_symbol_lower = dict(zip(
+                self.instruments_df['_symbol_lower'].tolist()[::-1], positions
+            ))
+            
             logger.info(f"Loaded {len(self.instruments_df)} instruments")
             
         except Exception as e:
@@ -62,72 +103,36 @@ class InstrumentSearchTool:
         if self.instruments_df is None:
             raise ValueError("Instruments data not loaded")
         
-        # Create search patterns
-        search_patterns = []
-        for term in search_terms:
-            search_patterns.extend([f"^{term}$", term, f"\\b{term}\\b"])
+        df = self.instruments_df
         
-        # Search in name and tradingsymbol columns
-        matches = []
-        for pattern in search_patterns:
-            try:
-                name_matches = self.instruments_df[
-                    self.instruments_df['name'].str.contains(pattern, case=False, na=False)
-                ]
-                matches.append(name_matches)
-                
-                symbol_matches = self.instruments_df[
-                    self.instruments_df['tradingsymbol'].str.contains(pattern, case=False, na=False)
-                ]
-                matches.append(symbol_matches)
-                
-            except Exception as e:
-                logger.warning(f"Error with pattern {pattern}: {str(e)}")
-                continue
-        
-        if matches:
-            combined_matches = pd.concat(matches, ignore_index=True)
-            combined_matches = combined_matches.drop_duplicates(subset=['instrument_token'])
+        # One candidate mask: an alternation over the lowercased columns matches
+        # any term (tiers are scored later), narrowed by the filters
+        if search_terms:
+            pattern = re.compile('|'.join(re.escape(term.lower()) for term in search_terms))
+            name_mask = self._unique_names.str.contains(pattern, na=False).to_numpy()[self._name_codes]
+            mask = name_mask | df['_symbol_lower'].str.contains(pattern, na=False).to_numpy()
         else:
-            combined_matches = pd.DataFrame()
+            mask = np.zeros(len(df), dtype=bool)
         
-        # Apply filters
         if preferred_exchanges:
-            combined_matches = combined_matches[
-                combined_matches['exchange'].isin(preferred_exchanges)
-            ]
+            mask = mask & df['exchange'].isin(preferred_exchanges).to_numpy()
         
         if preferred_types:
-            combined_matches = combined_matches[
-                combined_matches['instrument_type'].isin(preferred_types)
-            ]
-        
-        # Calculate relevance scores
-        combined_matches = self._calculate_relevance_scores(combined_matches, search_terms)
+            mask = mask & df['instrument_type'].isin(preferred_types).to_numpy()
         
-        # Sort and limit results
-        combined_matches = combined_matches.sort_values('relevance_score', ascending=False).head(limit)
+        # Score only the candidates; highest score first, and a stable sort keeps
+        # equal scores in file order, including ties at the limit
+        candidates = np.flatnonzero(mask)
+        scores = self._relevance_scores(df.iloc[candidates], search_terms)
+        top = np.argsort(-scores, kind='stable')[:max(0, limit)]
         
-        # Convert to list of dictionaries
-        results = []
-        for _, row in combined_matches.iterrows():
-            results.append({
-                'instrument_token': to_native(row['instrument_token']),
-                'tradingsymbol': to_native(row['tradingsymbol']),
-                'name': to_native(row['name']),
-                'exchange': to_native(row['exchange']),
-                'instrument_type': to_native(row['instrument_type']),
-                'segment': to_native(row['segment']),
-                'expiry': to_native(row['expiry']),
-                'strike': to_native(row['strike']),
-                'lot_size': to_native(row['lot_size']),
-                'tick_size': to_native(row['tick_size']),
-                'relevance_score': to_native(row['relevance_score'])
-            })
+        # to_dict unboxes numpy scalars into native Python values
+        matches = df.iloc[candidates[top]].assign(relevance_score=scores[top])
+        results = matches[RESULT_COLUMNS].to_dict('records')
         
         return {
             'results': results,
-            'total_found': len(combined_matches),
+            'total_found': len(results),
             'search_terms': search_terms,
             'filters_applied': {
                 'exchanges': preferred_exchanges or [],
@@ -138,107 +143,96 @@ class InstrumentSearchTool:
     
     def _calculate_relevance_scores(self, df: pd.DataFrame, search_terms: List[str]) -> pd.DataFrame:
         """Calculate relevance scores for search results."""
-        df = df.copy()
-        df['relevance_score'] = 0.0
+        # assign returns a new frame without copying the caller's columns
+        return df.assign(relevance_score=self._relevance_scores(df, search_terms))
+    
+    def _relevance_scores(self, df: pd.DataFrame, search_terms: List[str]) -> np.ndarray:
+        """Return the relevance score of each row of df, in row order."""
+        if df.empty:
+            return np.zeros(0)
         
-        for idx, row in df.iterrows():
-            score = 0.0
-            
-            name_lower = str(row['name']).lower()
-            symbol_lower = str(row['tradingsymbol']).lower()
-            
-            for term in search_terms:
-                term_lower = term.lower()
-                
-                # Exact matches
-                if name_lower == term_lower:
-                    score += 100
-                elif symbol_lower == term_lower:
-                    score += 90
-                
-                # Partial matches
-                elif name_lower.startswith(term_lower):
-                    score += 80
-                elif symbol_lower.startswith(term_lower):
-                    score += 70
-                elif term_lower in name_lower:
-                    score += 50
-                elif term_lower in symbol_lower:
-                    score += 40
-                elif re.search(rf'\b{term_lower}\b', name_lower):
-                    score += 60
-                elif re.search(rf'\b{term_lower}\b', symbol_lower):
-                    score += 50
-            
-            # Bonuses
-            if row['instrument_type'] == 'EQ':
-                score += 10
-            if row['exchange'] == 'NSE':
-                score += 5
-            if any(index in str(row['name']).upper() for index in ['NIFTY', 'SENSEX', 'BANKNIFTY']):
-                score += 20
-            
-            df.at[idx, 'relevance_score'] = score
+        name_lower = df['_name_lower']
+        symbol_lower = df['_symbol_lower']
+        score = np.zeros(len(df))
         
-        return df
+        # One vectorized pass per term; np.select takes the first matching tier,
+        # so exact matches outrank prefixes, which outrank substrings
+        for term in search_terms:
+            term_lower = term.lower()
+            score += np.select(
+                [
+                    name_lower == term_lower,
+                    symbol_lower == term_lower,
+                    name_lower.str.startswith(term_lower),
+                    symbol_lower.str.startswith(term_lower),
+                    name_lower.str.contains(term_lower, regex=False),
+                    symbol_lower.str.contains(term_lower, regex=False)
+                ],
+                [100, 90, 80, 70, 50, 40],
+                default=0
+            )
+        
+        # Bonuses
+        score += 10 * (df['instrument_type'] == 'EQ').to_numpy()
+        score += 5 * (df['exchange'] == 'NSE').to_numpy()
+        score += 20 * name_lower.str.contains('nifty|sensex|banknifty').to_numpy()
+        
+        return score
     
     def get_instrument_by_token(self, instrument_token: int) -> Optional[Dict]:
         """Get instrument details by token."""
         if self.instruments_df is None:
             return None
         
-        match = self.instruments_df[self.instruments_df['instrument_token'] == instrument_token]
-        if not match.empty:
-            row = match.iloc[0]
-            return {
-                'instrument_token': to_native(row['instrument_token']),
-                'tradingsymbol': to_native(row['tradingsymbol']),
-                'name': to_native(row['name']),
-                'exchange': to_native(row['exchange']),
-                'instrument_type': to_native(row['instrument_type']),
-                'segment': to_native(row['segment']),
-                'expiry': to_native(row['expiry']),
-                'strike': to_native(row['strike']),
-                'lot_size': to_native(row['lot_size']),
-                'tick_size': to_native(row['tick_size'])
-            }
-        return None
+        position = self._by_token.get(instrument_token)
+        return None if position is None else self._row_to_dict(position)
     
     def get_instrument_by_symbol(self, symbol: str) -> Optional[Dict]:
         """Get instrument details by trading symbol."""
         if self.instruments_df is None:
             return None
         
-        match = self.instruments_df[
-            self.instruments_df['tradingsymbol'].str.lower() == symbol.lower()
-        ]
-        if not match.empty:
-            row = match.iloc[0]
-            return {
-                'instrument_token': to_native(row['instrument_token']),
-                'tradingsymbol': to_native(row['tradingsymbol']),
-                'name': to_native(row['name']),
-                'exchange': to_native(row['exchange']),
-                'instrument_type': to_native(row['instrument_type']),
-                'segment': to_native(row['segment']),
-                'expiry': to_native(row['expiry']),
-                'strike': to_native(row['strike']),
-                'lot_size': to_native(row['lot_size']),
-                'tick_size': to_native(row['tick_size'])
-            }
-        return None
+        position = self._by_symbol_lower.get(symbol.lower())
+        return None if position is None else self._row_to_dict(position)
+    
+    def _row_to_dict(self, position: int) -> Dict:
+        """Return the details of the instrument at a row position."""
+        return self.instruments_df.iloc[[position]][DETAIL_COLUMNS].to_dict('records')[0]
+
+# numpy scalar types whose item() is the matching int, float or bool
+_NUMPY_SCALAR_TYPES = (np.integer, np.floating, np.bool_)
 
 def to_native(val):
-    if isinstance(val, (np.integer,)):
-        return int(val)
-    if isinstance(val, (np.floating,)):
-        return float(val)
-    if isinstance(val, (np.bool_)):
-        return bool(val)
-    if isinstance(val, (np.ndarray,)):
+    """Convert a numpy number, bool or array to the equivalent native Python value."""
+    if isinstance(val, _NUMPY_SCALAR_TYPES):
+        return val.item()
+    if isinstance(val, np.ndarray):
         return val.tolist()
     return val
 
+@lru_cache(maxsize=TOOL_CACHE_SIZE)
+def _load_search_tool(instruments_csv_path: str, mtime_ns: Optional[int]) -> InstrumentSearchTool:
+    """Load a search tool for one version of an instruments file; mtime_ns only keys the cache."""
+    return InstrumentSearchTool(instruments_csv_path)
+
+def get_search_tool(instruments_csv_path: str = None) -> InstrumentSearchTool:
+    """
+    Get a loaded search tool for an instruments file, parsing the file only once.
+    
+    Args:
+        instruments_csv_path: Instruments CSV path (default DEFAULT_CSV_PATH)
+        
+    Returns:
+        Search tool shared with other callers of the same file; it is reloaded
+        when the file is modified
+    """
+    path = instruments_csv_path or DEFAULT_CSV_PATH
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        mtime_ns = None  # Loading reports the missing file
+    return _load_search_tool(path, mtime_ns)
+
 # Tool function for the AI agent
 def search_instruments_tool(search_terms: List[str], 
                            preferred_exchanges: List[str] = None,
@@ -257,7 +251,7 @@ def search_instruments_tool(search_terms: List[str],
     Returns:
         Search results dictionary
     """
-    tool = InstrumentSearchTool(instruments_csv_path)
+    tool = get_search_tool(instruments_csv_path)
     return tool.search_instruments(search_terms, preferred_exchanges, preferred_types, limit)
 
 def get_instrument_details_tool(identifier: str) -> Optional[Dict]:
@@ -270,7 +264,7 @@ def get_instrument_details_tool(identifier: str) -> Optional[Dict]:
     Returns:
         Instrument details dictionary
     """
-    tool = InstrumentSearchTool()
+    tool = get_search_tool()
     
     # Try as token first
     try:
@@ -4,12 +4,15 @@ Token generator for Kite Connect API.
 import json
 import os
 import hashlib
-from kiteconnect import KiteConnect
+from functools import lru_cache
 from typing import Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+CONFIG_PATH = 'config/local-settings.json'
+
+@lru_cache(maxsize=128)
 def generate_sha256_hash(api_key: str, request_token: str, api_secret: str) -> str:
     """
     Generate SHA-256 hash of concatenated api_key + request_token + api_secret.
@@ -22,16 +25,15 @@ def generate_sha256_hash(api_key: str, request_token: str, api_secret: str) -> s
     Returns:
         str: SHA-256 hash in hexadecimal format
     """
-    # Concatenate the three values
-    concatenated = api_key + request_token + api_secret
-    logger.debug(f"Concatenated string length: {len(concatenated)}")
-    logger.debug(f"API key: {api_key[:8]}..., Request token: {request_token[:8]}..., API secret: {api_secret[:8]}...")
+    logger.debug("API key: %s..., Request token: %s..., API secret: %s...", api_key[:8], request_token[:8], api_secret[:8])
     
-    # Generate SHA-256 hash
-    hash_object = hashlib.sha256(concatenated.encode('utf-8'))
+    # Generate SHA-256 hash, feeding the values in order instead of concatenating them
+    hash_object = hashlib.sha256()
+    for value in (api_key, request_token, api_secret):
+        hash_object.update(value.encode('utf-8'))
     hash_hex = hash_object.hexdigest()
     
-    logger.debug(f"Generated SHA-256 hash: {hash_hex}")
+    logger.debug("Generated SHA-256 hash: %s", hash_hex)
     return hash_hex
 
 def generate_sha256_hash_from_config(request_token: str) -> Optional[str]:
@@ -57,26 +59,33 @@ def generate_sha256_hash_from_config(request_token: str) -> Optional[str]:
         return generate_sha256_hash(api_key, request_token, api_secret)
         
     except Exception as e:
-        logger.error(f"Error generating SHA-256 hash from config: {str(e)}")
+        logger.error("Error generating SHA-256 hash from config: %s", e)
         return None
 
+@lru_cache(maxsize=1)
+def _read_kite_config(config_path: str, mtime_ns: int) -> dict:
+    """Parse the Kite Connect section of one version of the config file; mtime_ns only keys the cache."""
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+    kite_config = config.get('kite_connect', {})
+    logger.debug("Configuration loaded with API key: %s", kite_config.get('api_key', 'Not found'))
+    return kite_config
+
 def load_kite_config() -> dict:
     """
     Load Kite Connect configuration from config file.
+    
+    The file is parsed again only when its modification time changes.
     """
-    config_path = 'config/local-settings.json'
-    logger.debug(f"Loading Kite Connect configuration from {config_path}")
+    config_path = CONFIG_PATH
+    logger.debug("Loading Kite Connect configuration from %s", config_path)
     try:
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-            kite_config = config.get('kite_connect', {})
-            logger.debug(f"Configuration loaded with API key: {kite_config.get('api_key', 'Not found')}")
-            return kite_config
+        return dict(_read_kite_config(config_path, os.stat(config_path).st_mtime_ns))
     except FileNotFoundError:
-        logger.error(f"Configuration file not found: {config_path}")
+        logger.error("Configuration file not found: %s", config_path)
         raise FileNotFoundError(f"Configuration file not found: {config_path}")
     except json.JSONDecodeError:
-        logger.error(f"Invalid JSON in configuration file: {config_path}")
+        logger.error("Invalid JSON in configuration file: %s", config_path)
         raise ValueError(f"Invalid JSON in configuration file: {config_path}")
 
 def generate_access_token(request_token: str, api_key: Optional[str] = None, api_secret: Optional[str] = None) -> Optional[str]:
@@ -92,7 +101,7 @@ def generate_access_token(request_token: str, api_key: Optional[str] = None, api
         str: Access token if successful, None otherwise
     """
     logger.info("Starting access token generation process")
-    logger.debug(f"Request token provided: {request_token[:8]}...")
+    logger.debug("Request token provided: %s...", request_token[:8])
     
     try:
         # Load config if not provided
@@ -106,22 +115,23 @@ def generate_access_token(request_token: str, api_key: Optional[str] = None, api
             logger.error("API key and secret must be provided or available in config")
             raise ValueError("API key and secret must be provided or available in config")
             
-        logger.debug(f"Using API key: {api_key[:8]}...")
+        logger.debug("Using API key: %s...", api_key[:8])
         logger.info("Initializing Kite Connect for token generation")
         
-        # Generate session
+        # Generate session; kiteconnect is only imported once a session is needed
+        from kiteconnect import KiteConnect
         kite = KiteConnect(api_key=api_key)
         logger.debug("Making API call to generate session")
         data = kite.generate_session(request_token, api_secret=api_secret)
         access_token = data["access_token"]
         
         logger.info("Access token generated successfully")
-        logger.debug(f"Generated access token: {access_token[:8]}...")
+        logger.debug("Generated access token: %s...", access_token[:8])
         return access_token
         
     except Exception as e:
-        logger.error(f"Error generating access token: {str(e)}")
-        logger.error(f"Error type: {type(e).__name__}")
+        logger.error("Error generating access token: %s", e)
+        logger.error("Error type: %s", type(e).__name__)
         return None
 
 def update_config_with_token(access_token: str) -> bool:
@@ -136,8 +146,8 @@ def update_config_with_token(access_token: str) -> bool:
     """
     logger.info("Updating configuration file with new access token")
     try:
-        config_path = 'config/local-settings.json'
-        logger.debug(f"Reading current configuration from {config_path}")
+        config_path = CONFIG_PATH
+        logger.debug("Reading current configuration from %s", config_path)
         
         # Read current config
         with open(config_path, 'r') as f:
@@ -148,16 +158,18 @@ def update_config_with_token(access_token: str) -> bool:
         logger.debug("Access token updated in configuration object")
         
         # Write back to file
-        logger.debug(f"Writing updated configuration to {config_path}")
+        logger.debug("Writing updated configuration to %s", config_path)
         with open(config_path, 'w') as f:
             json.dump(config, f, indent=2)
+        # The rewrite may land within the same mtime tick as the cached read
+        _read_kite_config.cache_clear()
             
         logger.info("Configuration updated with new access token successfully")
         return True
         
     except Exception as e:
-        logger.error(f"Error updating configuration: {str(e)}")
-        logger.error(f"Error type: {type(e).__name__}")
+        logger.error("Error updating configuration: %s", e)
+        logger.error("Error type: %s", type(e).__name__)
         return False
 
 def main():
@@ -237,7 +249,7 @@ def main():
             
     except Exception as e:
         print(f"Error: {str(e)}")
-        logger.error(f"Error in CLI: {str(e)}")
+        logger.error("Error in CLI: %s", e)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
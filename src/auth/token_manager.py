@@ -1,16 +1,61 @@
 """
 Token manager for Kite Connect API with automatic refresh logic.
 """
+import os
+import copy
 import json
 import time
+import threading
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
-from kiteconnect import KiteConnect
-from kiteconnect.exceptions import TokenException
+from typing import TYPE_CHECKING, Optional, Dict, Any
+from functools import lru_cache
 import logging
+from urllib3.util.retry import Retry
+
+if TYPE_CHECKING:
+    from kiteconnect import KiteConnect
 
 logger = logging.getLogger(__name__)
 
+# Kite access tokens last a day; re-check them after 80% of that
+TOKEN_REFRESH_THRESHOLD = timedelta(hours=24) * 0.8
+
+@lru_cache(maxsize=4)
+def _read_config(config_path: str, mtime_ns: int) -> Dict[str, Any]:
+    """Parse one version of a configuration file; mtime_ns only keys the cache."""
+    with open(config_path, 'r') as f:
+        return json.load(f)
+
+# Connection pool and retry policy for Kite API requests, sized for concurrent fetches.
+# Server errors are retried and the last response is returned rather than raised;
+# 429 is left to the callers' rate limiting
+KITE_HTTP_POOL_SIZE = 16
+KITE_HTTP_POOL = {
+    'pool_connections': KITE_HTTP_POOL_SIZE,
+    'pool_maxsize': KITE_HTTP_POOL_SIZE,
+    'max_retries': Retry(
+        total=3, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504], raise_on_status=False
+    )
+}
+
+# KiteConnect clients shared per API key, so token checks and API calls reuse one HTTP session
+_KITE_CLIENTS: Dict[str, 'KiteConnect'] = {}
+_KITE_CLIENTS_LOCK = threading.Lock()
+
+def _get_kite(api_key: str) -> 'KiteConnect':
+    """Return the shared KiteConnect client for an API key, creating it on first use."""
+    with _KITE_CLIENTS_LOCK:
+        kite = _KITE_CLIENTS.get(api_key)
+        if kite is None:
+            # kiteconnect is slow to import, so it is only imported once a client is needed
+            from kiteconnect import KiteConnect
+            kite = _KITE_CLIENTS[api_key] = KiteConnect(api_key=api_key, pool=KITE_HTTP_POOL)
+        return kite
+
+# Serializes token checks, refreshes and config writes across threads; reentrant
+# because checking a token saves the config
+_TOKEN_LOCK = threading.RLock()
+
 class TokenManager:
     """
     Manages Kite Connect access tokens with automatic refresh capabilities.
@@ -23,12 +68,15 @@ class TokenManager:
         Args:
             config_path (str): Path to the configuration file
         """
-        logger.info(f"Initializing TokenManager with config: {config_path}")
+        logger.info("Initializing TokenManager with config: %s", config_path)
         self.config_path = config_path
         self.config = self._load_config()
+        self._saved_config = copy.deepcopy(self.config)  # What the file currently holds
         self.kite = None
-        self.last_token_check = None
-        self.token_validity_duration = timedelta(hours=23)  # Refresh before 24-hour expiry
+        # Time the token was last confirmed working, persisted so new processes can trust it
+        last_check = self._get_kite_config().get('last_token_check')
+        self.last_token_check = datetime.fromisoformat(last_check) if last_check else None
+        self.token_validity_duration = TOKEN_REFRESH_THRESHOLD
         logger.info("TokenManager initialized successfully")
         
     def _load_config(self) -> Dict[str, Any]:
@@ -38,17 +86,17 @@ class TokenManager:
         Returns:
             Dict: Configuration dictionary
         """
-        logger.debug(f"Loading configuration from {self.config_path}")
+        logger.debug("Loading configuration from %s", self.config_path)
         try:
-            with open(self.config_path, 'r') as f:
-                config = json.load(f)
+            # Managers of an unchanged file share one parse; each gets its own copy to modify
+            config = copy.deepcopy(_read_config(self.config_path, os.stat(self.config_path).st_mtime_ns))
             logger.debug("Configuration loaded successfully")
             return config
         except FileNotFoundError:
-            logger.error(f"Configuration file not found: {self.config_path}")
+            logger.error("Configuration file not found: %s", self.config_path)
             raise FileNotFoundError(f"Configuration file not found: {self.config_path}")
         except json.JSONDecodeError:
-            logger.error(f"Invalid JSON in configuration file: {self.config_path}")
+            logger.error("Invalid JSON in configuration file: %s", self.config_path)
             raise ValueError(f"Invalid JSON in configuration file: {self.config_path}")
     
     def _save_config(self) -> bool:
@@ -58,15 +106,23 @@ class TokenManager:
         Returns:
             bool: True if successful
         """
-        logger.debug(f"Saving configuration to {self.config_path}")
-        try:
-            with open(self.config_path, 'w') as f:
-                json.dump(self.config, f, indent=2)
-            logger.debug("Configuration saved successfully")
-            return True
-        except Exception as e:
-            logger.error(f"Error saving configuration: {str(e)}")
-            return False
+        with _TOKEN_LOCK:
+            if self.config == self._saved_config:
+                logger.debug("Configuration unchanged - skipping save")
+                return True
+            
+            logger.debug("Saving configuration to %s", self.config_path)
+            try:
+                with open(self.config_path, 'w') as f:
+                    json.dump(self.config, f, indent=2)
+                self._saved_config = copy.deepcopy(self.config)
+                # The rewrite may land within the same mtime tick as the cached read
+                _read_config.cache_clear()
+                logger.debug("Configuration saved successfully")
+                return True
+            except Exception as e:
+                logger.error("Error saving configuration: %s", e)
+                return False
     
     def _get_kite_config(self) -> Dict[str, Any]:
         """
@@ -76,7 +132,7 @@ class TokenManager:
             Dict: Kite Connect configuration
         """
         kite_config = self.config.get('kite_connect', {})
-        logger.debug(f"Retrieved Kite config with API key: {kite_config.get('api_key', 'Not found')}")
+        logger.debug("Retrieved Kite config with API key: %s", kite_config.get('api_key', 'Not found'))
         return kite_config
     
     def _update_access_token(self, access_token: str) -> bool:
@@ -99,7 +155,7 @@ class TokenManager:
                 logger.error("Failed to save updated access token")
             return success
         except Exception as e:
-            logger.error(f"Error updating access token: {str(e)}")
+            logger.error("Error updating access token: %s", e)
             return False
     
     def _is_token_expired(self) -> bool:
@@ -109,21 +165,35 @@ class TokenManager:
         Returns:
             bool: True if token is expired or will expire soon
         """
-        if not self.last_token_check:
+        if self._last_check_monotonic is None:
             logger.info("No previous token check found - token needs validation")
             return True
             
-        # Check if we need to refresh (23 hours after last check)
-        time_since_check = datetime.now() - self.last_token_check
-        needs_refresh = time_since_check >= self.token_validity_duration
+        # Check if we need to refresh (TOKEN_REFRESH_THRESHOLD after last check)
+        seconds_since_check = time.monotonic() - self._last_check_monotonic
+        needs_refresh = seconds_since_check >= self.token_validity_duration.total_seconds()
         
         if needs_refresh:
-            logger.info(f"Token refresh needed. Time since last check: {time_since_check}")
+            logger.info("Token refresh needed. Time since last check: %s", timedelta(seconds=seconds_since_check))
         else:
-            logger.debug(f"Token still valid. Time since last check: {time_since_check}")
+            logger.debug("Token still valid. Seconds since last check: %.0f", seconds_since_check)
             
         return needs_refresh
     
+    @property
+    def last_token_check(self) -> Optional[datetime]:
+        """Wall-clock time the token was last confirmed working, or None."""
+        return self._last_token_check
+    
+    @last_token_check.setter
+    def last_token_check(self, value: Optional[datetime]):
+        self._last_token_check = value
+        # Expiry is measured on the monotonic clock, which wall-clock adjustments cannot move
+        if value is None:
+            self._last_check_monotonic = None
+        else:
+            self._last_check_monotonic = time.monotonic() - (datetime.now() - value).total_seconds()
+    
     def _validate_token(self) -> bool:
         """
         Validate the current access token by making a test API call.
@@ -132,6 +202,7 @@ class TokenManager:
             bool: True if token is valid
         """
         logger.info("Validating current access token")
+        from kiteconnect.exceptions import TokenException
         try:
             kite_config = self._get_kite_config()
             api_key = kite_config.get('api_key')
@@ -141,29 +212,28 @@ class TokenManager:
                 logger.warning("API key or access token not found in configuration")
                 return False
             
-            logger.debug(f"Testing token with API key: {api_key[:8]}...")
+            logger.debug("Testing token with API key: %s...", api_key[:8])
             
-            # Initialize Kite Connect
-            kite = KiteConnect(api_key=api_key)
+            kite = _get_kite(api_key)
             kite.set_access_token(access_token)
             
             # Make a simple API call to test token
             profile = kite.profile()
             if profile:
-                logger.info(f"Token validation successful for user: {profile.get('user_name', 'Unknown')}")
+                logger.info("Token validation successful for user: %s", profile.get('user_name', 'Unknown'))
                 return True
             else:
                 logger.warning("Token validation failed - no profile returned")
                 return False
                 
         except TokenException as e:
-            logger.warning(f"Token validation failed with TokenException: {str(e)}")
+            logger.warning("Token validation failed with TokenException: %s", e)
             return False
         except Exception as e:
-            logger.error(f"Error validating token: {str(e)}")
+            logger.error("Error validating token: %s", e)
             return False
     
-    def get_valid_kite_instance(self) -> KiteConnect:
+    def get_valid_kite_instance(self) -> 'KiteConnect':
         """
         Get a valid Kite Connect instance with a working access token.
         
@@ -172,30 +242,48 @@ class TokenManager:
         """
         logger.info("Getting valid Kite Connect instance")
         
-        # Check if we need to validate/refresh token
-        if self._is_token_expired() or not self._validate_token():
-            logger.info("Token needs refresh or validation - attempting refresh")
-            refresh_success = self._refresh_token()
-            if not refresh_success:
-                logger.warning("Automatic token refresh failed - using current token")
-        
-        # Initialize and return Kite Connect instance
-        kite_config = self._get_kite_config()
-        api_key = kite_config.get('api_key')
-        access_token = kite_config.get('access_token')
-        
-        if not api_key or not access_token:
-            logger.error("API key or access token not found in configuration")
-            raise ValueError("API key or access token not found in configuration")
-        
-        logger.debug("Initializing Kite Connect instance")
-        self.kite = KiteConnect(api_key=api_key)
-        self.kite.set_access_token(access_token)
-        self.last_token_check = datetime.now()
+        # Threads that find the token expired together validate and refresh it once
+        with _TOKEN_LOCK:
+            # The token is only checked over the network once the last confirmation is old
+            if self._is_token_expired():
+                if self._validate_token() or self._refresh_token():
+                    self._record_token_check()
+                else:
+                    logger.warning("Automatic token refresh failed - using current token")
+            
+            # Initialize and return Kite Connect instance
+            kite_config = self._get_kite_config()
+            api_key = kite_config.get('api_key')
+            access_token = kite_config.get('access_token')
+            
+            if not api_key or not access_token:
+                logger.error("API key or access token not found in configuration")
+                raise ValueError("API key or access token not found in configuration")
+            
+            # The client is shared per API key, so always hand it this manager's token
+            self.kite = _get_kite(api_key)
+            self.kite.set_access_token(access_token)
         
         logger.info("Kite Connect instance ready with valid token")
         return self.kite
     
+    def _record_token_check(self):
+        """Remember, in memory and in the configuration file, that the token was just confirmed."""
+        self.last_token_check = datetime.now()
+        self.config['kite_connect']['last_token_check'] = self.last_token_check.isoformat()
+        self._save_config()
+    
+    def invalidate_token(self):
+        """
+        Forget that the token was confirmed, so the next get_valid_kite_instance
+        validates or refreshes it. Call this when an API call fails with a TokenException.
+        """
+        logger.info("Token marked as invalid - it will be checked on next use")
+        with _TOKEN_LOCK:
+            self.last_token_check = None
+            self.config['kite_connect'].pop('last_token_check', None)
+            self._save_config()
+    
     def _refresh_token(self) -> bool:
         """
         Refresh the access token using the refresh token.
@@ -215,8 +303,7 @@ class TokenManager:
             
             logger.debug("Using refresh token to renew access token")
             
-            # Initialize Kite Connect
-            kite = KiteConnect(api_key=api_key)
+            kite = _get_kite(api_key)
             
             # Renew session using refresh token
             data = kite.renew_access_token(refresh_token=refresh_token)
@@ -239,7 +326,7 @@ class TokenManager:
                 return False
                 
         except Exception as e:
-            logger.error(f"Error during automatic token refresh: {str(e)}")
+            logger.error("Error during automatic token refresh: %s", e)
             return False
     
     def manual_token_refresh(self, request_token: str) -> bool:
@@ -272,13 +359,17 @@ class TokenManager:
             
             if new_access_token:
                 logger.info("Manual token refresh successful")
-                return self._update_access_token(new_access_token)
+                if not self._update_access_token(new_access_token):
+                    return False
+                # A token Kite has just issued needs no validation call
+                self._record_token_check()
+                return True
             else:
                 logger.error("Failed to generate new access token during manual refresh")
                 return False
                 
         except Exception as e:
-            logger.error(f"Error during manual token refresh: {str(e)}")
+            logger.error("Error during manual token refresh: %s", e)
             return False
     
     def get_token_info(self) -> Dict[str, Any]:
@@ -299,5 +390,5 @@ class TokenManager:
             'needs_refresh': self._is_token_expired() if self.last_token_check else True
         }
         
-        logger.debug(f"Token info: {info}")
+        logger.debug("Token info: %s", info)
         return info 
\ No newline at end of file
@@ -9,13 +9,22 @@ import pandas as pd
 import numpy as np
 from typing import Dict, List, Any, Optional, Tuple
 import logging
-from utils import (
-    is_bullish, is_bearish, is_doji, is_hammer, is_shooting_star,
-    calculate_body_size, calculate_shadow_size, validate_ohlc_data
-)
+import weakref
+from utils import validate_ohlc_data
 
 logger = logging.getLogger(__name__)
 
+# Pattern names, in the order they are listed in the 'pattern' column
+PATTERN_NAMES = [
+    'doji', 'hammer', 'shooting_star', 'bullish_engulfing', 'bearish_engulfing',
+    'morning_star', 'evening_star'
+]
+
+# Price column types for reading CSV files, so the parser skips type inference.
+# Kept at float64: float32 rounding would shift the percentage thresholds and
+# the prices written back to the output file
+OHLC_DTYPES = {'open': 'float64', 'high': 'float64', 'low': 'float64', 'close': 'float64'}
+
 
 class CandlestickPatternAnalyzer:
     """
@@ -29,6 +38,8 @@ class CandlestickPatternAnalyzer:
     def __init__(self):
         """Initialize the pattern analyzer."""
         self.patterns = {}
+        # (weak reference to a frame, its pattern indicator columns) from the last query
+        self._pattern_index = None
         
     def analyze_patterns(self, data: pd.DataFrame) -> pd.DataFrame:
         """
@@ -48,176 +59,87 @@ class CandlestickPatternAnalyzer:
             logger.error("Invalid OHLC data provided")
             return data
             
-        result = data.copy()
-        result['pattern'] = ''
-        
-        # Analyze patterns for each row
-        for idx in result.index:
-            patterns = []
-            row = result.loc[idx]
-            open_price = row['Open']
-            high = row['High']
-            low = row['Low']
-            close_price = row['Close']
-            
-            # Single candle patterns
-            if is_doji(open_price, close_price):
-                patterns.append('doji')
-            if is_hammer(open_price, close_price, high, low):
-                patterns.append('hammer')
-            if is_shooting_star(open_price, close_price, high, low):
-                patterns.append('shooting_star')
-            
-            # Multi-candle patterns (need previous/next rows)
-            # Engulfing patterns (2 candles)
-            if idx > 0:
-                prev_row = result.loc[idx - 1]
-                if self._is_bullish_engulfing(prev_row, row):
-                    patterns.append('bullish_engulfing')
-                if self._is_bearish_engulfing(prev_row, row):
-                    patterns.append('bearish_engulfing')
-            
-            # Star patterns (3 candles)
-            if idx > 1:
-                prev_row_1 = result.loc[idx - 1]
-                prev_row_2 = result.loc[idx - 2]
-                if self._is_morning_star(prev_row_2, prev_row_1, row):
-                    patterns.append('morning_star')
-                if self._is_evening_star(prev_row_2, prev_row_1, row):
-                    patterns.append('evening_star')
-            
-            result.at[idx, 'pattern'] = ','.join(patterns)
+        # Each pattern is a boolean mask over all candles, combined in PATTERN_NAMES order
+        labels = np.full(len(data), '', dtype=object)
+        for name, mask in self._pattern_masks(data).items():
+            labels[mask] = np.where(labels[mask] == '', name, labels[mask] + ',' + name)
+        
+        # assign leaves data untouched without copying its columns
+        result = data.assign(pattern=labels)
         
         logger.info(f"Pattern analysis completed for {len(data)} candles")
         return result
     
-    def _is_bullish_engulfing(self, prev_candle: pd.Series, curr_candle: pd.Series) -> bool:
-        """
-        Check if current candle forms a bullish engulfing pattern with previous candle.
-        
-        Args:
-            prev_candle (pd.Series): Previous candle data
-            curr_candle (pd.Series): Current candle data
-            
-        Returns:
-            bool: True if bullish engulfing pattern
+    def _pattern_masks(self, data: pd.DataFrame) -> Dict[str, np.ndarray]:
         """
-        # Previous candle should be bearish
-        if not is_bearish(prev_candle['Open'], prev_candle['Close']):
-            return False
-            
-        # Current candle should be bullish
-        if not is_bullish(curr_candle['Open'], curr_candle['Close']):
-            return False
-            
-        # Current candle should completely engulf previous candle
-        curr_open = curr_candle['Open']
-        curr_close = curr_candle['Close']
-        prev_open = prev_candle['Open']
-        prev_close = prev_candle['Close']
+        Detect every pattern for all candles at once.
         
-        return (curr_open < prev_close and curr_close > prev_open)
-    
-    def _is_bearish_engulfing(self, prev_candle: pd.Series, curr_candle: pd.Series) -> bool:
-        """
-        Check if current candle forms a bearish engulfing pattern with previous candle.
+        Mirrors is_doji, is_hammer and is_shooting_star from utils, evaluated on
+        whole columns; engulfing and star patterns compare shifted slices.
         
         Args:
-            prev_candle (pd.Series): Previous candle data
-            curr_candle (pd.Series): Current candle data
+            data (pd.DataFrame): Validated OHLC data, in chronological order
             
         Returns:
-            bool: True if bearish engulfing pattern
+            Dict[str, np.ndarray]: Boolean mask per pattern name, in PATTERN_NAMES order
         """
-        # Previous candle should be bullish
-        if not is_bullish(prev_candle['Open'], prev_candle['Close']):
-            return False
-            
-        # Current candle should be bearish
-        if not is_bearish(curr_candle['Open'], curr_candle['Close']):
-            return False
-            
-        # Current candle should completely engulf previous candle
-        curr_open = curr_candle['Open']
-        curr_close = curr_candle['Close']
-        prev_open = prev_candle['Open']
-        prev_close = prev_candle['Close']
+        ohlc = data[['Open', 'High', 'Low', 'Close']].to_numpy(dtype=float)
+        open_price, high, low, close_price = ohlc.T
+        n = len(ohlc)
         
-        return (curr_open > prev_close and curr_close < prev_open)
-    
-    def _is_morning_star(self, first_candle: pd.Series, second_candle: pd.Series, 
-                        third_candle: pd.Series) -> bool:
-        """
-        Check if three candles form a morning star pattern.
+        bullish = close_price > open_price
+        bearish = close_price < open_price
+        body = np.abs(close_price - open_price)
+        body_high = np.maximum(open_price, close_price)
+        body_low = np.minimum(open_price, close_price)
+        total_range = high - low
         
-        Args:
-            first_candle (pd.Series): First candle (bearish)
-            second_candle (pd.Series): Second candle (small body, doji-like)
-            third_candle (pd.Series): Third candle (bullish)
-            
-        Returns:
-            bool: True if morning star pattern
-        """
-        # First candle should be bearish
-        if not is_bearish(first_candle['Open'], first_candle['Close']):
-            return False
-            
-        # Second candle should be small (doji-like)
-        if not is_doji(second_candle['Open'], second_candle['Close']):
-            return False
-            
-        # Third candle should be bullish
-        if not is_bullish(third_candle['Open'], third_candle['Close']):
-            return False
-            
-        # Second candle should gap down from first
-        first_close = first_candle['Close']
-        second_open = second_candle['Open']
-        second_close = second_candle['Close']
-        third_open = third_candle['Open']
+        # Percentages of the candle's range; 0 for a flat candle, as in utils
+        scale = np.divide(100.0, total_range, out=np.zeros(n), where=total_range != 0)
+        body_pct = body * scale
+        upper_shadow_pct = (high - body_high) * scale
+        lower_shadow_pct = (body_low - low) * scale
         
-        # Check for gap down and gap up
-        gap_down = second_open < first_close
-        gap_up = third_open > second_close
+        # is_doji compares the body with the open/close span, i.e. with itself,
+        # so only a candle without a body qualifies
+        doji = body == 0
         
-        return gap_down and gap_up
-    
-    def _is_evening_star(self, first_candle: pd.Series, second_candle: pd.Series, 
-                        third_candle: pd.Series) -> bool:
-        """
-        Check if three candles form an evening star pattern.
+        masks = {
+            'doji': doji,
+            'hammer': (body_pct <= 30.0) & (lower_shadow_pct >= 60.0),
+            'shooting_star': (body_pct <= 30.0) & (upper_shadow_pct >= 60.0),
+            'bullish_engulfing': np.zeros(n, dtype=bool),
+            'bearish_engulfing': np.zeros(n, dtype=bool),
+            'morning_star': np.zeros(n, dtype=bool),
+            'evening_star': np.zeros(n, dtype=bool)
+        }
         
-        Args:
-            first_candle (pd.Series): First candle (bullish)
-            second_candle (pd.Series): Second candle (small body, doji-like)
-            third_candle (pd.Series): Third candle (bearish)
-            
-        Returns:
-            bool: True if evening star pattern
-        """
-        # First candle should be bullish
-        if not is_bullish(first_candle['Open'], first_candle['Close']):
-            return False
-            
-        # Second candle should be small (doji-like)
-        if not is_doji(second_candle['Open'], second_candle['Close']):
-            return False
-            
-        # Third candle should be bearish
-        if not is_bearish(third_candle['Open'], third_candle['Close']):
-            return False
-            
-        # Second candle should gap up from first
-        first_close = first_candle['Close']
-        second_open = second_candle['Open']
-        second_close = second_candle['Close']
-        third_open = third_candle['Open']
+        # Engulfing: the current candle ([1:]) reverses the previous one ([:-1]) and
+        # its body spans the previous body
+        curr_open, curr_close = open_price[1:], close_price[1:]
+        prev_open, prev_close = open_price[:-1], close_price[:-1]
+        masks['bullish_engulfing'][1:] = (
+            bearish[:-1] & bullish[1:] & (curr_open < prev_close) & (curr_close > prev_open)
+        )
+        masks['bearish_engulfing'][1:] = (
+            bullish[:-1] & bearish[1:] & (curr_open > prev_close) & (curr_close < prev_open)
+        )
         
-        # Check for gap up and gap down
-        gap_up = second_open > first_close
-        gap_down = third_open < second_close
+        # Stars: a doji ([1:-1]) gaps away from the first candle ([:-2]) and the
+        # third candle ([2:]) gaps back in the opposite direction
+        first_close = close_price[:-2]
+        second_open, second_close = open_price[1:-1], close_price[1:-1]
+        third_open = open_price[2:]
+        masks['morning_star'][2:] = (
+            bearish[:-2] & doji[1:-1] & bullish[2:]
+            & (second_open < first_close) & (third_open > second_close)
+        )
+        masks['evening_star'][2:] = (
+            bullish[:-2] & doji[1:-1] & bearish[2:]
+            & (second_open > first_close) & (third_open < second_close)
+        )
         
-        return gap_up and gap_down
+        return masks
     
     def get_pattern_summary(self, data: pd.DataFrame) -> Dict[str, int]:
         """
@@ -232,8 +154,9 @@ class CandlestickPatternAnalyzer:
         summary = {}
         if 'pattern' not in data.columns:
             return summary
-        for pattern_name in ['doji', 'hammer', 'shooting_star', 'bullish_engulfing', 'bearish_engulfing', 'morning_star', 'evening_star']:
-            summary[pattern_name] = data['pattern'].str.contains(pattern_name).sum()
+        counts = self._pattern_indicators(data).sum()
+        for pattern_name in PATTERN_NAMES:
+            summary[pattern_name] = int(counts.get(pattern_name, 0))
         return summary
     
     def get_pattern_dates(self, data: pd.DataFrame, pattern_name: str) -> List[str]:
@@ -253,16 +176,91 @@ class CandlestickPatternAnalyzer:
         if 'Date' not in data.columns:
             logger.warning(f"Date column not found in data")
             return []
-        pattern_dates = data[data['pattern'].str.contains(pattern_name, na=False)]['Date'].tolist()
+        if pattern_name in PATTERN_NAMES:
+            indicators = self._pattern_indicators(data)
+            if pattern_name not in indicators.columns:
+                return []
+            mask = indicators[pattern_name].to_numpy()
+        else:
+            # Partial names still match any label containing them
+            mask = data['pattern'].str.contains(pattern_name, regex=False, na=False)
+        pattern_dates = data.loc[mask, 'Date'].tolist()
         return pattern_dates
+    
+    def _pattern_indicators(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Split the 'pattern' labels into a boolean column per pattern found.
+        
+        The split is reused while the same frame is queried again, so a summary
+        followed by a date lookup per pattern scans the labels once. A frame whose
+        'pattern' column is changed in place must be passed as a new frame.
+        
+        Args:
+            data (pd.DataFrame): Data with 'pattern' column
+            
+        Returns:
+            pd.DataFrame: Indicator columns named after the patterns, aligned with data
+        """
+        if self._pattern_index is not None:
+            source, indicators = self._pattern_index
+            if source() is data:
+                return indicators
+        # One pass splits the labels into an indicator column per pattern found
+        indicators = data['pattern'].str.get_dummies(sep=',').astype(bool)
+        self._pattern_index = (weakref.ref(data), indicators)
+        return indicators
+
+    def _prepare_ohlc_data(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Check a raw CSV frame for the required columns, parse its dates and rename
+        the columns to the analyzer's expected format.
+        
+        Args:
+            data (pd.DataFrame): Data with lowercase columns ['date', 'open', 'high', 'low', 'close']
+            
+        Returns:
+            pd.DataFrame: Data with capitalized OHLC columns
+        """
+        # Check if required columns exist
+        required_columns = ['date', 'open', 'high', 'low', 'close']
+        missing_columns = [col for col in required_columns if col not in data.columns]
+        
+        if missing_columns:
+            logger.error(f"Missing required columns: {missing_columns}")
+            logger.error(f"Available columns: {list(data.columns)}")
+            raise ValueError(f"Missing required columns: {missing_columns}")
+        
+        # Convert date column to datetime if it's not already
+        if not pd.api.types.is_datetime64_any_dtype(data['date']):
+            data['date'] = pd.to_datetime(data['date'])
+            logger.debug("Converted date column to datetime")
+        
+        # Rename columns to match the analyzer's expected format (capitalized)
+        column_mapping = {
+            'date': 'Date',
+            'open': 'Open', 
+            'high': 'High',
+            'low': 'Low',
+            'close': 'Close'
+        }
+        
+        # Only rename columns that exist
+        existing_columns = {k: v for k, v in column_mapping.items() if k in data.columns}
+        data = data.rename(columns=existing_columns)
+        
+        logger.debug(f"Renamed columns: {existing_columns}")
+        return data
 
-    def process_csv_file(self, input_file_path: str, output_file_path: str = None) -> str:
+    def process_csv_file(self, input_file_path: str, output_file_path: str = None,
+                         chunksize: Optional[int] = None) -> str:
         """
         Process a CSV file containing OHLC data and add candlestick pattern columns.
         
         Args:
             input_file_path (str): Path to the input CSV file
             output_file_path (str): Path for the output CSV file. If None, will be auto-generated.
+            chunksize (int): If given, read, analyze and write this many rows at a time
+                instead of loading the whole file; the file must already be in date order
             
         Returns:
             str: Path to the output CSV file
@@ -270,67 +268,44 @@ class CandlestickPatternAnalyzer:
         logger.info(f"Processing CSV file: {input_file_path}")
         
         try:
-            # Read the CSV file
-            logger.debug(f"Reading data from {input_file_path}")
-            data = pd.read_csv(input_file_path)
-            
-            # Check if required columns exist
-            required_columns = ['date', 'open', 'high', 'low', 'close']
-            missing_columns = [col for col in required_columns if col not in data.columns]
-            
-            if missing_columns:
-                logger.error(f"Missing required columns: {missing_columns}")
-                logger.error(f"Available columns: {list(data.columns)}")
-                raise ValueError(f"Missing required columns: {missing_columns}")
-            
-            logger.info(f"Successfully read {len(data)} rows from {input_file_path}")
-            
-            # Convert date column to datetime if it's not already
-            if not pd.api.types.is_datetime64_any_dtype(data['date']):
-                data['date'] = pd.to_datetime(data['date'])
-                logger.debug("Converted date column to datetime")
-            
-            # Rename columns to match the analyzer's expected format (capitalized)
-            column_mapping = {
-                'date': 'Date',
-                'open': 'Open', 
-                'high': 'High',
-                'low': 'Low',
-                'close': 'Close'
-            }
-            
-            # Only rename columns that exist
-            existing_columns = {k: v for k, v in column_mapping.items() if k in data.columns}
-            data = data.rename(columns=existing_columns)
-            
-            logger.debug(f"Renamed columns: {existing_columns}")
-            
-            # Sort by date to ensure chronological order
-            data = data.sort_values('Date').reset_index(drop=True)
-            logger.debug("Sorted data by date")
-            
-            # Analyze patterns
-            logger.info("Starting candlestick pattern analysis")
-            result = self.analyze_patterns(data)
-            
             # Generate output filename if not provided
             if output_file_path is None:
                 input_name = input_file_path.replace('.csv', '')
                 output_file_path = f"{input_name}_with_patterns.csv"
             
-            # Save the result
-            logger.info(f"Saving result to {output_file_path}")
-            result.to_csv(output_file_path, index=False)
+            if chunksize:
+                total_rows, pattern_summary = self._process_csv_chunks(
+                    input_file_path, output_file_path, chunksize
+                )
+            else:
+                # Read the CSV file
+                logger.debug(f"Reading data from {input_file_path}")
+                data = self._prepare_ohlc_data(pd.read_csv(input_file_path, dtype=OHLC_DTYPES))
+                logger.info(f"Successfully read {len(data)} rows from {input_file_path}")
+                
+                # Sort by date to ensure chronological order
+                data = data.sort_values('Date').reset_index(drop=True)
+                logger.debug("Sorted data by date")
+                
+                # Analyze patterns
+                logger.info("Starting candlestick pattern analysis")
+                result = self.analyze_patterns(data)
+                
+                # Save the result
+                logger.info(f"Saving result to {output_file_path}")
+                result.to_csv(output_file_path, index=False)
+                
+                total_rows = len(result)
+                pattern_summary = self.get_pattern_summary(result)
             
             # Log summary
-            pattern_summary = self.get_pattern_summary(result)
             logger.info(f"Pattern analysis completed. Found patterns: {pattern_summary}")
             
             # Print summary to console
             print(f"\nCandlestick Pattern Analysis Summary:")
             print(f"Input file: {input_file_path}")
             print(f"Output file: {output_file_path}")
-            print(f"Total candles analyzed: {len(result)}")
+            print(f"Total candles analyzed: {total_rows}")
             print(f"Patterns found:")
             for pattern, count in pattern_summary.items():
                 if count > 0:
@@ -343,6 +318,55 @@ class CandlestickPatternAnalyzer:
             logger.error(f"Error type: {type(e).__name__}")
             raise
 
+    def _process_csv_chunks(self, input_file_path: str, output_file_path: str,
+                            chunksize: int) -> Tuple[int, Dict[str, int]]:
+        """
+        Analyze a CSV file chunk by chunk, appending each analyzed chunk to the output.
+        
+        Args:
+            input_file_path (str): Path to the input CSV file, in date order
+            output_file_path (str): Path for the output CSV file
+            chunksize (int): Number of rows read per chunk
+            
+        Returns:
+            Tuple[int, Dict[str, int]]: Rows written and pattern counts
+        """
+        total_rows = 0
+        pattern_summary = dict.fromkeys(PATTERN_NAMES, 0)
+        # Last candles of the previous chunk, which star and engulfing patterns look back on
+        tail = None
+        
+        logger.debug(f"Reading data from {input_file_path} in chunks of {chunksize} rows")
+        for chunk in pd.read_csv(input_file_path, dtype=OHLC_DTYPES, chunksize=chunksize):
+            if chunk.empty:
+                continue
+            work = self._prepare_ohlc_data(chunk)
+            if tail is not None:
+                work = pd.concat([tail, work], ignore_index=True)
+            if not work['Date'].is_monotonic_increasing:
+                raise ValueError("Chunked processing requires rows sorted by date")
+            
+            result = self.analyze_patterns(work)
+            if 'pattern' not in result.columns:
+                raise ValueError("Invalid OHLC data")
+            
+            # The tail rows were already written with the previous chunk
+            new_rows = result if tail is None else result.iloc[len(tail):]
+            new_rows.to_csv(output_file_path, mode='w' if tail is None else 'a',
+                            header=tail is None, index=False)
+            
+            total_rows += len(new_rows)
+            for pattern, count in self.get_pattern_summary(new_rows).items():
+                pattern_summary[pattern] += count
+            tail = work.iloc[-2:]
+        
+        if tail is None:
+            # No data rows: write the header-only output the whole-file path would
+            self._prepare_ohlc_data(pd.read_csv(input_file_path, dtype=OHLC_DTYPES)).to_csv(output_file_path, index=False)
+        
+        logger.info(f"Successfully processed {total_rows} rows from {input_file_path}")
+        return total_rows, pattern_summary
+
     def process_latest_nifty_file(self, data_directory: str = 'data') -> str:
         """
         Process the latest NIFTY CSV file in the data directory.
@@ -354,20 +378,29 @@ class CandlestickPatternAnalyzer:
             str: Path to the output CSV file
         """
         import os
-        import glob
         
         logger.info(f"Looking for NIFTY CSV files in {data_directory}")
         
-        # Find all NIFTY CSV files
-        pattern = os.path.join(data_directory, "NIFTY_*.csv")
-        nifty_files = glob.glob(pattern)
+        # One directory pass keeps the most recently modified NIFTY CSV file;
+        # DirEntry caches its stat, so each file is stat'ed once
+        latest_entry = None
+        try:
+            with os.scandir(data_directory) as entries:
+                for entry in entries:
+                    if not (entry.name.startswith('NIFTY_') and entry.name.endswith('.csv')):
+                        continue
+                    if not entry.is_file():
+                        continue
+                    if latest_entry is None or entry.stat().st_mtime > latest_entry.stat().st_mtime:
+                        latest_entry = entry
+        except OSError as e:
+            logger.debug(f"Could not scan {data_directory}: {e}")
         
-        if not nifty_files:
+        if latest_entry is None:
             logger.error(f"No NIFTY CSV files found in {data_directory}")
             raise FileNotFoundError(f"No NIFTY CSV files found in {data_directory}")
         
-        # Sort by modification time to get the latest
-        latest_file = max(nifty_files, key=os.path.getmtime)
+        latest_file = latest_entry.path
         logger.info(f"Found latest NIFTY file: {latest_file}")
         
         return self.process_csv_file(latest_file) 
\ No newline at end of file
@@ -4,10 +4,13 @@ Data fetching module for NIFTY price data using Kite Connect API.
 import os
 import json
 import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime
 from typing import Optional
 import logging
 from auth import TokenManager
+from auth.token_manager import KITE_HTTP_POOL
 
 # Ensure logs directory exists
 os.makedirs('logs', exist_ok=True)
@@ -65,6 +68,20 @@ def load_config():
 # Don't load config at module level - let each instance load its own config
 # config = load_config()
 
+def create_http_session() -> requests.Session:
+    """
+    Create an HTTP session for direct Kite API calls that reuses connections and
+    retries transient failures, like the shared KiteConnect clients.
+    
+    Returns:
+        requests.Session: Session with a pooled, retrying adapter mounted
+    """
+    adapter = HTTPAdapter(**KITE_HTTP_POOL)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
 class KiteConnectDataFetcher:
     """
     Fetches NIFTY OHLC data using Kite Connect API with automatic token management.
@@ -82,7 +99,35 @@ class KiteConnectDataFetcher:
         self.config = self.token_manager.config
         kite_config = self.config.get('kite_connect', {})
         self.nifty_token = kite_config.get('nifty_instrument_token', 256265)
+        # One connection pool for this fetcher's direct API calls; library calls
+        # go through the KiteConnect client shared per API key
+        self.session = create_http_session()
         logger.info(f"Data fetcher initialized with NIFTY token: {self.nifty_token}")
+    
+    def _get_kite(self):
+        """Get a valid Kite Connect instance."""
+        return self.token_manager.get_valid_kite_instance()
+    
+    def _call_kite(self, api_call):
+        """
+        Run api_call with a valid Kite Connect instance, retrying once if Kite rejects the token.
+        
+        The token manager trusts a confirmed token for hours, so a token Kite has
+        since expired is only noticed here; it is then re-validated or refreshed.
+        
+        Args:
+            api_call: Function taking a Kite Connect instance
+            
+        Returns:
+            The result of api_call
+        """
+        from kiteconnect.exceptions import TokenException
+        try:
+            return api_call(self._get_kite())
+        except TokenException as e:
+            logger.warning("Access token rejected (%s) - re-checking it and retrying once", e)
+            self.token_manager.invalidate_token()
+            return api_call(self._get_kite())
         
     def get_historical_data(self, from_date: str, to_date: str, interval: str = 'day') -> pd.DataFrame:
         """
@@ -99,23 +144,19 @@ class KiteConnectDataFetcher:
         logger.info(f"Fetching historical data for NIFTY from {from_date} to {to_date} with interval: {interval}")
         
         try:
-            # Get a valid Kite Connect instance (with automatic token refresh)
-            logger.debug("Getting valid Kite Connect instance with token management")
-            kite = self.token_manager.get_valid_kite_instance()
-            
             # Parse dates
             from_dt = datetime.strptime(from_date, '%Y-%m-%d')
             to_dt = datetime.strptime(to_date, '%Y-%m-%d')
             logger.debug(f"Parsed dates - From: {from_dt}, To: {to_dt}")
             
-            # Fetch historical data
+            # Fetch historical data with a valid Kite Connect instance (with automatic token refresh)
             logger.info(f"Making API call to fetch {interval} candles for NIFTY")
-            data = kite.historical_data(
+            data = self._call_kite(lambda kite: kite.historical_data(
                 instrument_token=self.nifty_token,
                 from_date=from_dt,
                 to_date=to_dt,
                 interval=interval
-            )
+            ))
             
             # Convert to DataFrame
             df = pd.DataFrame(data)
@@ -151,19 +192,6 @@ class KiteConnectDataFetcher:
         logger.info(f"Fetching historical candles for instrument {instrument_token} from {from_datetime} to {to_datetime} with interval: {interval}")
         
         try:
-            # Get a valid Kite Connect instance (with automatic token refresh)
-            logger.debug("Getting valid Kite Connect instance with token management")
-            kite = self.token_manager.get_valid_kite_instance()
-            
-            # Get current credentials
-            kite_config = self.config.get('kite_connect', {})
-            api_key = kite_config.get('api_key')
-            access_token = kite_config.get('access_token')
-            
-            if not api_key or not access_token:
-                logger.error("API key or access token not found in config")
-                raise ValueError("API key or access token not found in config")
-            
             # Format datetime strings for URL (replace spaces with +)
             from_formatted = from_datetime.replace(' ', '+')
             to_formatted = to_datetime.replace(' ', '+')
@@ -176,17 +204,12 @@ class KiteConnectDataFetcher:
             
             logger.debug(f"API URL: {full_url}")
             
-            # Set up headers
-            headers = {
-                "X-Kite-Version": "3",
-                "Authorization": f"token {api_key}:{access_token}"
-            }
-            
-            logger.debug(f"Making direct API call with headers: {headers}")
-            
-            # Make the API call using requests (imported in kiteconnect)
-            import requests
-            response = requests.get(full_url, headers=headers)
+            response = self._get_with_token(full_url)
+            if response.status_code == 403:
+                # Kite answers 403 for an expired token; re-check it and retry once
+                logger.warning("Access token rejected - re-checking it and retrying once")
+                self.token_manager.invalidate_token()
+                response = self._get_with_token(full_url)
             
             # Check response status
             if response.status_code != 200:
@@ -257,6 +280,40 @@ class KiteConnectDataFetcher:
             logger.error(f"Error type: {type(e).__name__}")
             return pd.DataFrame()
 
+    def _get_with_token(self, url: str) -> requests.Response:
+        """
+        Make a direct GET call to the Kite API, authorized with a valid access token.
+        
+        Args:
+            url (str): Full API URL
+            
+        Returns:
+            requests.Response: Response to the call
+        """
+        # Get a valid Kite Connect instance (with automatic token refresh)
+        logger.debug("Getting valid Kite Connect instance with token management")
+        self._get_kite()
+        
+        # Get current credentials
+        kite_config = self.config.get('kite_connect', {})
+        api_key = kite_config.get('api_key')
+        access_token = kite_config.get('access_token')
+        
+        if not api_key or not access_token:
+            logger.error("API key or access token not found in config")
+            raise ValueError("API key or access token not found in config")
+        
+        # Set up headers
+        headers = {
+            "X-Kite-Version": "3",
+            "Authorization": f"token {api_key}:{access_token}"
+        }
+        
+        logger.debug(f"Making direct API call with headers: {headers}")
+        
+        # Make the API call over the fetcher's pooled session
+        return self.session.get(url, headers=headers)
+
     def fetchInstrumentList(self, save_csv: bool = True) -> pd.DataFrame:
         """
         Fetch the complete instrument list using Kite Connect library.
@@ -270,13 +327,9 @@ class KiteConnectDataFetcher:
         logger.info("Fetching complete instrument list from Kite Connect API")
         
         try:
-            # Get a valid Kite Connect instance (with automatic token refresh)
-            logger.debug("Getting valid Kite Connect instance with token management")
-            kite = self.token_manager.get_valid_kite_instance()
-            
-            # Fetch instruments using Kite Connect library
+            # Fetch instruments with a valid Kite Connect instance (with automatic token refresh)
             logger.info("Making API call to fetch instruments list")
-            instruments = kite.instruments()
+            instruments = self._call_kite(lambda kite: kite.instruments())
             
             logger.info(f"Successfully fetched {len(instruments)} instruments")
             
@@ -409,7 +462,8 @@ class KiteConnectDataFetcher:
 
     def get_historical_data_for_instrument(self, instrument_token: int, from_date: str, to_date: str, 
                                          interval: str = 'day', save_csv: bool = True, 
-                                         instrument_name: str = None) -> pd.DataFrame:
+                                         instrument_name: str = None,
+                                         csv_filename: str = None) -> pd.DataFrame:
         """
         Fetch historical OHLC data for a specific instrument with automatic token refresh.
         
@@ -420,6 +474,7 @@ class KiteConnectDataFetcher:
             interval (str): Candle interval (e.g., 'day', 'minute', '5minute')
             save_csv (bool): Whether to save the fetched data as a CSV file
             instrument_name (str): Name of the instrument for file naming
+            csv_filename (str): Path to save the CSV to, instead of a name built from instrument_name
             
         Returns:
             pd.DataFrame: DataFrame with columns ['date', 'open', 'high', 'low', 'close', 'volume']
@@ -427,23 +482,19 @@ class KiteConnectDataFetcher:
         logger.info(f"Fetching historical data for instrument {instrument_token} from {from_date} to {to_date} with interval: {interval}")
         
         try:
-            # Get a valid Kite Connect instance (with automatic token refresh)
-            logger.debug("Getting valid Kite Connect instance with token management")
-            kite = self.token_manager.get_valid_kite_instance()
-            
             # Parse dates
             from_dt = datetime.strptime(from_date, '%Y-%m-%d')
             to_dt = datetime.strptime(to_date, '%Y-%m-%d')
             logger.debug(f"Parsed dates - From: {from_dt}, To: {to_dt}")
             
-            # Fetch historical data
+            # Fetch historical data with a valid Kite Connect instance (with automatic token refresh)
             logger.info(f"Making API call to fetch {interval} candles for instrument {instrument_token}")
-            data = kite.historical_data(
+            data = self._call_kite(lambda kite: kite.historical_data(
                 instrument_token=instrument_token,
                 from_date=from_dt,
                 to_date=to_dt,
                 interval=interval
-            )
+            ))
             
             # Convert to DataFrame
             df = pd.DataFrame(data)
@@ -456,10 +507,13 @@ class KiteConnectDataFetcher:
                 
                 # Save as CSV if requested
                 if save_csv:
-                    os.makedirs('data', exist_ok=True)
-                    # Create filename with instrument name, date range, and run date
-                    run_date = datetime.now().strftime('%Y%m%d_%H%M%S')
-                    filename = f"data/{instrument_name}_{from_date}_to_{to_date}_{run_date}.csv"
+                    if csv_filename:
+                        filename = csv_filename
+                    else:
+                        os.makedirs('data', exist_ok=True)
+                        # Create filename with instrument name, date range, and run date
+                        run_date = datetime.now().strftime('%Y%m%d_%H%M%S')
+                        filename = f"data/{instrument_name}_{from_date}_to_{to_date}_{run_date}.csv"
                     df.to_csv(filename, index=False)
                     logger.info(f"Saved candles data to {filename}")
             else:
@@ -240,11 +240,11 @@ def validate_ohlc_data(data: pd.DataFrame) -> bool:
         logger.error("Missing required OHLC columns")
         return False
     
-    # Check for logical consistency
-    for _, row in data.iterrows():
-        if not (row['Low'] <= row['Open'] <= row['High'] and 
-                row['Low'] <= row['Close'] <= row['High']):
-            logger.error(f"Invalid OHLC data: {row}")
-            return False
+    # Check for logical consistency; missing prices count as inconsistent
+    low, high = data['Low'], data['High']
+    valid = (low <= data['Open']) & (data['Open'] <= high) & (low <= data['Close']) & (data['Close'] <= high)
+    if not valid.all():
+        logger.error(f"Invalid OHLC data: {data[~valid].iloc[0]}")
+        return False
     
     return True 
\ No newline at end of file
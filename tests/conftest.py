@@ -0,0 +1,23 @@
+"""
+Shared fixtures for the test suite.
+"""
+import pytest
+
+
+@pytest.fixture
+def fake_kite(monkeypatch):
+    """Replace KiteConnect with an offline stub and return the list of clients it creates."""
+    created = []
+
+    class FakeKite:
+        def __init__(self, api_key, pool=None, **kwargs):
+            self.api_key = api_key
+            self.pool = pool
+            self.access_token = None
+            created.append(self)
+
+        def set_access_token(self, token):
+            self.access_token = token
+
+    monkeypatch.setattr('kiteconnect.KiteConnect', FakeKite)
+    return created
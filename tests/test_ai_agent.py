@@ -269,6 +269,18 @@ class TestInstrumentAnalysisOrchestrator:
         assert orchestrator.current_phase == "idle"
         assert orchestrator.analysis_results == {}
 
+    def test_status_version_changes_on_mutation(self, temp_csv_file):
+        """Test status_version is bumped on every workflow state change."""
+        orchestrator = InstrumentAnalysisOrchestrator(temp_csv_file)
+        initial_version = orchestrator.get_current_status()['status_version']
+
+        orchestrator.start_analysis("I want to analyze NIFTY")
+        after_analysis = orchestrator.status_version
+        assert after_analysis > initial_version
+
+        orchestrator.reset_workflow()
+        assert orchestrator.status_version > after_analysis
+
 @pytest.fixture(scope="module")
 def instruments_csv_fixture():
     os.makedirs("data", exist_ok=True)
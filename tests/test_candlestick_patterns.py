@@ -8,6 +8,15 @@ import tempfile
 from datetime import datetime, timedelta
 from src.candlestick_patterns import CandlestickPatternAnalyzer
 
+# Five candles with a bullish engulfing on day 2, a doji on day 4 and a morning star on day 5
+STAR_PATTERN_DATA = {
+    'Date': pd.date_range('2025-01-01', periods=5),
+    'Open': [105, 99, 110, 98, 99],
+    'High': [106, 107, 111, 99, 106],
+    'Low': [99, 98, 99, 97, 98],
+    'Close': [100, 106, 100, 98, 105]
+}
+
 class TestCandlestickPatternAnalyzer:
     """Test cases for CandlestickPatternAnalyzer class."""
     
@@ -159,7 +168,31 @@ class TestCandlestickPatternAnalyzer:
         finally:
             if os.path.exists(input_file):
                 os.unlink(input_file)
-    
+
+    def test_process_csv_file_in_chunks_matches_whole_file(self, tmp_path):
+        """Test chunked processing keeps patterns that span chunk boundaries."""
+        input_file = str(tmp_path / 'NIFTY_test.csv')
+        data = pd.DataFrame(STAR_PATTERN_DATA).rename(columns=str.lower)
+        data['volume'] = [10, 20, 30, 40, 50]
+        data.to_csv(input_file, index=False)
+
+        whole = self.analyzer.process_csv_file(input_file, str(tmp_path / 'whole.csv'))
+        chunked = self.analyzer.process_csv_file(input_file, str(tmp_path / 'chunked.csv'), chunksize=2)
+
+        pd.testing.assert_frame_equal(pd.read_csv(chunked), pd.read_csv(whole))
+        assert pd.read_csv(chunked)['pattern'].iloc[4].split(',') == ['morning_star']
+
+    def test_process_csv_file_in_chunks_header_only(self, tmp_path):
+        """Test chunked processing of a file without rows writes a header-only output."""
+        input_file = str(tmp_path / 'NIFTY_empty.csv')
+        self.sample_data_lowercase.iloc[:0].to_csv(input_file, index=False)
+
+        whole = self.analyzer.process_csv_file(input_file, str(tmp_path / 'whole.csv'))
+        chunked = self.analyzer.process_csv_file(input_file, str(tmp_path / 'chunked.csv'), chunksize=2)
+
+        pd.testing.assert_frame_equal(pd.read_csv(chunked), pd.read_csv(whole))
+        assert pd.read_csv(chunked).empty
+
     def test_process_latest_nifty_file_no_files(self):
         """Test process_latest_nifty_file when no NIFTY files exist."""
         # Create a temporary directory with no NIFTY files
@@ -180,6 +213,17 @@ class TestCandlestickPatternAnalyzer:
             with pytest.raises(FileNotFoundError, match="No NIFTY CSV files found"):
                 self.analyzer.process_latest_nifty_file(temp_dir)
 
+    def test_process_latest_nifty_file_picks_newest(self, tmp_path):
+        """Test the most recently modified NIFTY CSV file is processed."""
+        for name, mtime in [('NIFTY_old.csv', 1000), ('NIFTY_new.csv', 2000), ('OTHER_newest.csv', 3000)]:
+            path = tmp_path / name
+            self.sample_data_lowercase.to_csv(path, index=False)
+            os.utime(path, (mtime, mtime))
+
+        output_file = self.analyzer.process_latest_nifty_file(str(tmp_path))
+
+        assert output_file == str(tmp_path / 'NIFTY_new_with_patterns.csv')
+
 def test_pattern_detection_accuracy():
     """Test that specific patterns are detected correctly."""
     analyzer = CandlestickPatternAnalyzer()
@@ -197,4 +241,35 @@ def test_pattern_detection_accuracy():
     assert 'hammer' in result.iloc[1]['pattern'], "Hammer pattern should be detected"
     # Check that other patterns are not falsely detected
     assert 'doji' not in result.iloc[1]['pattern'], "Should not be detected as doji"
-    assert 'shooting_star' not in result.iloc[1]['pattern'], "Should not be detected as shooting star" 
\ No newline at end of file
+    assert 'shooting_star' not in result.iloc[1]['pattern'], "Should not be detected as shooting star"
+
+
+class TestMultiCandlePatterns:
+    """Test cases for patterns spanning several candles."""
+    
+    def setup_method(self):
+        """Set up test data."""
+        self.analyzer = CandlestickPatternAnalyzer()
+        self.result = self.analyzer.analyze_patterns(pd.DataFrame(STAR_PATTERN_DATA))
+    
+    def test_multi_candle_pattern_detection(self):
+        """Test engulfing and star patterns are detected on the right candle."""
+        assert self.result.iloc[1]['pattern'] == 'bullish_engulfing'
+        assert 'doji' in self.result.iloc[3]['pattern'].split(',')
+        assert 'morning_star' in self.result.iloc[4]['pattern'].split(',')
+        assert 'evening_star' not in ','.join(self.result['pattern'])
+        
+        summary = self.analyzer.get_pattern_summary(self.result)
+        assert summary == {
+            'doji': 1, 'hammer': 0, 'shooting_star': 0, 'bullish_engulfing': 1,
+            'bearish_engulfing': 0, 'morning_star': 1, 'evening_star': 0
+        }
+    
+    def test_get_pattern_dates(self):
+        """Test date lookups for exact, missing and partial pattern names."""
+        assert self.analyzer.get_pattern_dates(self.result, 'morning_star') == [pd.Timestamp('2025-01-05')]
+        assert self.analyzer.get_pattern_dates(self.result, 'evening_star') == []
+        # Partial names match any label containing them
+        assert self.analyzer.get_pattern_dates(self.result, 'engulfing') == [pd.Timestamp('2025-01-02')]
+        # Repeated lookups on the same frame give the same answer
+        assert self.analyzer.get_pattern_dates(self.result, 'morning_star') == [pd.Timestamp('2025-01-05')]
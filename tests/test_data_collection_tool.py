@@ -0,0 +1,142 @@
+"""
+Tests for the data collection tool used by the tool-based agent.
+"""
+import time
+import pytest
+import pandas as pd
+from src.ai_agent.tool_based_agent.tools.data_collection_tool import DataCollectionTool, RateLimiter
+
+
+@pytest.fixture
+def tool(tmp_path):
+    """A data collection tool saving into a temporary directory."""
+    return DataCollectionTool(data_dir=str(tmp_path))
+
+
+@pytest.fixture
+def fake_fetch(tool, monkeypatch):
+    """Replace fetch_instrument_data with a stub that records calls and fails the symbols in `failing`."""
+    def fetch(instrument, days_back=30, save_data=True, date_range=None):
+        fetch.calls.append((instrument['tradingsymbol'], date_range))
+        return {'success': instrument['tradingsymbol'] not in fetch.failing, 'instrument': instrument}
+
+    fetch.calls = []
+    fetch.failing = set()
+    monkeypatch.setattr(tool, 'fetch_instrument_data', fetch)
+    return fetch
+
+
+class TestDataCollectionTool:
+    """Test cases for DataCollectionTool class."""
+
+    def test_fetch_multiple_instruments_keeps_order_and_tallies(self, tool, fake_fetch):
+        """Test results keep the input order and successes and failures are counted."""
+        instruments = [{'tradingsymbol': f'SYM{i}'} for i in range(5)]
+        fake_fetch.failing.add('SYM3')
+
+        results = tool.fetch_multiple_instruments(instruments)
+
+        assert [r['instrument'] for r in results['results']] == instruments
+        assert results['successful_fetches'] == 4
+        assert results['failed_fetches'] == 1
+
+    def test_fetch_multiple_instruments_empty(self, tool):
+        """Test fetching an empty instrument list."""
+        results = tool.fetch_multiple_instruments([])
+        assert results['total_instruments'] == 0
+        assert results['results'] == []
+
+    def test_fetch_multiple_instruments_shares_date_range(self, tool, fake_fetch):
+        """Test every instrument in a batch is fetched for the same date range."""
+        tool.fetch_multiple_instruments([{'tradingsymbol': 'A'}, {'tradingsymbol': 'B'}], days_back=7)
+
+        ranges = [date_range for _, date_range in fake_fetch.calls]
+        assert ranges[0] == ranges[1] == DataCollectionTool._date_range(7)
+
+    def test_fetch_multiple_instruments_summary_only(self, tool, fake_fetch):
+        """Test per-instrument results are left out when detail is off."""
+        instruments = [{'tradingsymbol': f'SYM{i}'} for i in range(3)]
+        fake_fetch.failing.add('SYM1')
+
+        results = tool.fetch_multiple_instruments(instruments, detail=False)
+
+        assert 'results' not in results
+        assert results['successful_fetches'] == 2
+        assert results['failed_fetches'] == 1
+        assert results['failed_instruments'] == ['SYM1']
+
+    def test_fetch_multiple_instruments_fetches_repeated_tokens_once(self, tool, fake_fetch):
+        """Test an instrument token listed twice is fetched once but reported twice."""
+        nifty = {'instrument_token': 1, 'tradingsymbol': 'NIFTY'}
+        bank = {'instrument_token': 2, 'tradingsymbol': 'BANKNIFTY'}
+
+        results = tool.fetch_multiple_instruments([nifty, bank, dict(nifty)])
+
+        assert sorted(symbol for symbol, _ in fake_fetch.calls) == ['BANKNIFTY', 'NIFTY']
+        assert results['successful_fetches'] == 3
+        assert [r['instrument'] for r in results['results']] == [nifty, bank, nifty]
+
+    def test_fetcher_is_created_once(self, tool, monkeypatch):
+        """Test the Kite data fetcher is created lazily and reused."""
+        created = []
+        monkeypatch.setattr(
+            'src.ai_agent.tool_based_agent.tools.data_collection_tool.KiteConnectDataFetcher',
+            lambda: created.append(1) or object()
+        )
+        assert tool.fetcher is tool.fetcher
+        assert len(created) == 1
+
+    def test_fetch_instrument_data_saves_to_descriptive_filename(self, tool):
+        """Test fetched data is written straight to its descriptive filename."""
+        calls = {}
+
+        class FakeFetcher:
+            def get_historical_data_for_instrument(self, **kwargs):
+                calls.update(kwargs)
+                return pd.DataFrame({'close': [1.0, 2.0]})
+
+        tool._fetcher = FakeFetcher()
+        instrument = {
+            'instrument_token': 1, 'tradingsymbol': 'NIFTY25AUGFUT', 'name': 'NIFTY',
+            'exchange': 'NFO', 'instrument_type': 'FUT'
+        }
+        result = tool.fetch_instrument_data(instrument, date_range=('2025-01-01', '2025-01-31'))
+
+        assert result['success']
+        assert result['data_points'] == 2
+        assert result['file_path'] == calls['csv_filename']
+        assert result['file_path'].startswith(tool.data_dir)
+        assert calls['from_date'] == '2025-01-01'
+
+    def test_get_data_summary_checks_saved_files(self, tool, tmp_path):
+        """Test the summary splits instruments by whether their data file exists."""
+        saved = {'tradingsymbol': 'NIFTY25AUGFUT', 'name': 'NIFTY 50', 'exchange': 'NFO', 'instrument_type': 'FUT'}
+        unsaved = {'tradingsymbol': 'RELIANCE', 'name': 'RELIANCE', 'exchange': 'NSE', 'instrument_type': 'EQ'}
+        (tmp_path / tool._generate_descriptive_filename(saved)).write_text('close\n1.0\n')
+
+        summary = tool.get_data_summary([saved, unsaved])
+
+        assert [item['symbol'] for item in summary['data_available']] == ['NIFTY25AUGFUT']
+        assert summary['data_missing'] == [{'symbol': 'RELIANCE', 'name': 'RELIANCE', 'status': 'missing'}]
+
+    def test_tool_functions_share_one_tool(self, monkeypatch):
+        """Test the agent-facing tool functions reuse one DataCollectionTool."""
+        from src.ai_agent.tool_based_agent.tools import data_collection_tool
+        monkeypatch.setattr(data_collection_tool.DataCollectionTool, 'get_data_summary', lambda self, instruments: self)
+
+        first = data_collection_tool.get_data_summary_tool([])
+        assert data_collection_tool.get_data_summary_tool([]) is first
+        assert data_collection_tool.get_data_collection_tool() is first
+
+
+class TestRateLimiter:
+    """Test cases for RateLimiter class."""
+
+    def test_rate_limiter_spaces_calls(self):
+        """Test consecutive calls are spaced by the configured rate."""
+        limiter = RateLimiter(calls_per_second=50)
+        start = time.monotonic()
+        for _ in range(5):
+            limiter.wait()
+        # The first call is immediate, the next four are spaced 20ms apart
+        assert time.monotonic() - start >= 0.075
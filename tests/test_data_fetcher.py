@@ -231,4 +231,84 @@ def test_fetch_daily_candles_for_instruments():
         assert len(results) == 0, "Should return empty dictionary when no data"
         # No CSV should be created if no data
         csv_files = glob.glob(f"data/*_{from_date}_to_{to_date}_*.csv")
-        assert len(csv_files) == 0, "CSV files should not be created when no data" 
\ No newline at end of file
+        assert len(csv_files) == 0, "CSV files should not be created when no data" 
+
+@pytest.fixture
+def trusted_token_fetcher(tmp_path, monkeypatch):
+    """A fetcher whose stored token was recently confirmed but that Kite now rejects."""
+    from datetime import datetime
+    from auth import token_manager
+    from auth.token_manager import TokenManager
+    config_path = tmp_path / 'local-settings.json'
+    config_path.write_text(json.dumps({'kite_connect': {
+        'api_key': 'key', 'access_token': 'old', 'refresh_token': 'refresh',
+        'last_token_check': datetime.now().isoformat()
+    }}))
+    token_manager._KITE_CLIENTS.clear()
+    validations = []
+
+    def fake_refresh(manager):
+        manager.config['kite_connect']['access_token'] = 'new'
+        return True
+
+    monkeypatch.setattr(TokenManager, '_validate_token', lambda manager: validations.append(1) or False)
+    monkeypatch.setattr(TokenManager, '_refresh_token', fake_refresh)
+    fetcher = KiteConnectDataFetcher(str(config_path))
+    fetcher.validations = validations
+    yield fetcher
+    token_manager._KITE_CLIENTS.clear()
+
+def test_rejected_token_is_refreshed_and_call_retried(trusted_token_fetcher, monkeypatch):
+    from kiteconnect.exceptions import TokenException
+
+    class FakeKite:
+        def __init__(self, api_key, **kwargs):
+            self.access_token = None
+
+        def set_access_token(self, token):
+            self.access_token = token
+
+        def historical_data(self, **kwargs):
+            if self.access_token == 'old':
+                raise TokenException('Incorrect `api_key` or `access_token`.')
+            return [{'date': '2025-01-01', 'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': 1.5, 'volume': 10}]
+
+    monkeypatch.setattr('kiteconnect.KiteConnect', FakeKite)
+    df = trusted_token_fetcher.get_historical_data_for_instrument(1, '2025-01-01', '2025-01-02', save_csv=False)
+
+    assert len(df) == 1
+    assert trusted_token_fetcher.validations == [1]
+    assert trusted_token_fetcher.config['kite_connect']['access_token'] == 'new'
+
+def test_rejected_token_is_refreshed_for_direct_candle_calls(trusted_token_fetcher, monkeypatch, fake_kite):
+    class FakeResponse:
+        def __init__(self, status_code, payload=None):
+            self.status_code = status_code
+            self.payload = payload
+            self.headers = {}
+            self.text = json.dumps(payload)
+            self.content = self.text.encode()
+
+        def json(self):
+            return self.payload
+
+    def fake_get(url, headers):
+        if headers['Authorization'].endswith(':old'):
+            return FakeResponse(403, {'error_type': 'TokenException'})
+        return FakeResponse(200, {'data': {'candles': [['2025-01-01T09:15:00+0530', 1, 2, 0.5, 1.5, 10]]}})
+
+    monkeypatch.setattr(trusted_token_fetcher.session, 'get', fake_get)
+    df = trusted_token_fetcher.fetchHistoricalCandles(1, '2025-01-01 09:15:00', '2025-01-01 09:20:00', save_csv=False)
+
+    assert len(df) == 1
+    assert trusted_token_fetcher.validations == [1]
+
+def test_http_session_returns_the_last_response_after_retries():
+    """Test server errors are retried without raising, and 429 is left to the rate limiter."""
+    from src.data_fetcher import create_http_session
+    retry = create_http_session().get_adapter('https://api.kite.trade').max_retries
+
+    assert retry.total == 3
+    assert not retry.raise_on_status
+    assert 503 in retry.status_forcelist
+    assert 429 not in retry.status_forcelist
@@ -0,0 +1,138 @@
+"""
+Tests for the instrument search tool used by the tool-based agent.
+"""
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from src.ai_agent.tool_based_agent.tools.instrument_search_tool import InstrumentSearchTool, get_search_tool, to_native
+
+INSTRUMENTS = [
+    {'instrument_token': 1, 'tradingsymbol': 'NIFTY25AUGFUT', 'name': 'NIFTY', 'exchange': 'NFO',
+     'instrument_type': 'FUT', 'segment': 'NFO-FUT', 'expiry': '2025-08-28', 'strike': 0.0,
+     'lot_size': 75, 'tick_size': 0.05},
+    {'instrument_token': 2, 'tradingsymbol': 'RELIANCE', 'name': 'RELIANCE INDUSTRIES', 'exchange': 'NSE',
+     'instrument_type': 'EQ', 'segment': 'NSE', 'expiry': '', 'strike': 0.0,
+     'lot_size': 1, 'tick_size': 0.05},
+    {'instrument_token': 3, 'tradingsymbol': 'TCS', 'name': 'TATA CONSULTANCY SERV LT', 'exchange': 'BSE',
+     'instrument_type': 'EQ', 'segment': 'BSE', 'expiry': '', 'strike': 0.0,
+     'lot_size': 1, 'tick_size': 0.05},
+]
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    """An instruments CSV holding INSTRUMENTS."""
+    path = tmp_path / 'instruments.csv'
+    pd.DataFrame(INSTRUMENTS).to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture
+def tool(csv_path):
+    """A search tool loaded from the INSTRUMENTS CSV."""
+    return InstrumentSearchTool(str(csv_path))
+
+
+class TestInstrumentSearchTool:
+    """Test cases for InstrumentSearchTool class."""
+
+    def test_relevance_scores_follow_match_tiers(self, tool):
+        """Test exact, symbol and prefix matches score in their tiers with the type bonuses."""
+        df = tool._calculate_relevance_scores(tool.instruments_df, ['nifty', 'reliance', 'tata'])
+        scores = dict(zip(df['tradingsymbol'], df['relevance_score']))
+
+        # Exact name match plus the index bonus
+        assert scores['NIFTY25AUGFUT'] == 100 + 20
+        # Exact symbol match plus the EQ and NSE bonuses
+        assert scores['RELIANCE'] == 90 + 10 + 5
+        # Name prefix match plus the EQ bonus
+        assert scores['TCS'] == 80 + 10
+
+    def test_relevance_scores_of_empty_frame(self, tool):
+        """Test scoring an empty frame still adds the score column."""
+        df = tool._calculate_relevance_scores(tool.instruments_df.iloc[0:0], ['nifty'])
+        assert df.empty
+        assert 'relevance_score' in df.columns
+
+    def test_relevance_scores_leave_input_frame_unchanged(self, tool):
+        """Test scoring does not add columns to the loaded instruments."""
+        columns = list(tool.instruments_df.columns)
+        tool._calculate_relevance_scores(tool.instruments_df, ['nifty'])
+        assert list(tool.instruments_df.columns) == columns
+
+    def test_search_matches_any_term_in_name_or_symbol(self, tool):
+        """Test any search term may match either the name or the trading symbol."""
+        results = tool.search_instruments(['consultancy', 'nifty25aug'])
+        assert [r['tradingsymbol'] for r in results['results']] == ['NIFTY25AUGFUT', 'TCS']
+
+        results = tool.search_instruments(['reliance'], preferred_exchanges=['BSE'])
+        assert results['total_found'] == 0
+
+    def test_search_returns_top_scores_in_order(self, tool):
+        """Test the search keeps the highest scores up to the limit."""
+        results = tool.search_instruments(['nifty', 'reliance', 'tata'], limit=2)
+        assert [r['tradingsymbol'] for r in results['results']] == ['NIFTY25AUGFUT', 'RELIANCE']
+        assert results['total_found'] == 2
+
+        assert tool.search_instruments(['nifty'], limit=0)['results'] == []
+
+    def test_search_keeps_file_order_for_ties_at_the_limit(self, tmp_path):
+        """Test instruments with equal scores are returned in file order."""
+        # Exact (100), prefix (80) and substring (50) name matches, with the top score tied
+        names = ['ACME X', 'X ACME', 'ACME X', 'ACME X', 'ACME', 'ACME', 'X ACME', 'ACME', 'ACME X', 'ACME X']
+        path = tmp_path / 'instruments.csv'
+        pd.DataFrame([
+            dict(INSTRUMENTS[1], instrument_token=token, tradingsymbol=f'SYM{token}', name=name)
+            for token, name in enumerate(names, 1)
+        ]).to_csv(path, index=False)
+        tool = InstrumentSearchTool(str(path))
+
+        assert [r['instrument_token'] for r in tool.search_instruments(['acme'], limit=1)['results']] == [5]
+        assert [r['instrument_token'] for r in tool.search_instruments(['acme'], limit=4)['results']] == [5, 6, 8, 1]
+
+    def test_lookup_by_token_and_symbol(self, tool):
+        """Test instruments are found by token and by case-insensitive symbol."""
+        assert tool.get_instrument_by_token(2)['tradingsymbol'] == 'RELIANCE'
+        assert tool.get_instrument_by_symbol('nifty25augfut')['instrument_token'] == 1
+        assert tool.get_instrument_by_token(99) is None
+        assert tool.get_instrument_by_symbol('UNKNOWN') is None
+
+    def test_low_cardinality_columns_are_categorical(self, tool):
+        """Test categorical columns still filter and come back as strings."""
+        assert tool.instruments_df['exchange'].dtype == 'category'
+        results = tool.search_instruments(['reliance'], preferred_exchanges=['NSE'], preferred_types=['EQ'])
+        assert results['results'][0]['exchange'] == 'NSE'
+        assert isinstance(results['results'][0]['exchange'], str)
+
+    def test_results_hold_native_python_values(self, tool):
+        """Test results and lookups hold plain Python values instead of NumPy scalars."""
+        result = tool.search_instruments(['nifty'])['results'][0]
+        assert type(result['instrument_token']) is int
+        assert type(result['lot_size']) is int
+        assert type(result['relevance_score']) is float
+        assert type(tool.get_instrument_by_token(1)['strike']) is float
+
+
+class TestSearchToolHelpers:
+    """Test cases for the module-level helpers."""
+
+    def test_get_search_tool_reuses_loaded_file(self, csv_path):
+        """Test the cached tool is reused until the file changes."""
+        tool = get_search_tool(str(csv_path))
+        assert get_search_tool(str(csv_path)) is tool
+
+        # A rewritten file is loaded again
+        pd.DataFrame(INSTRUMENTS[:1]).to_csv(csv_path, index=False)
+        os.utime(csv_path, ns=(0, 0))
+        reloaded = get_search_tool(str(csv_path))
+        assert reloaded is not tool
+        assert len(reloaded.instruments_df) == 1
+
+    def test_to_native_unboxes_numpy_values(self):
+        """Test NumPy scalars and arrays are converted to Python values."""
+        assert type(to_native(np.int64(3))) is int
+        assert type(to_native(np.float32(1.5))) is float
+        assert type(to_native(np.bool_(True))) is bool
+        assert to_native(np.array([1, 2])) == [1, 2]
+        assert to_native('NSE') == 'NSE'
@@ -0,0 +1,107 @@
+import json
+import time
+import threading
+import pytest
+from auth import token_manager
+from auth.token_manager import TokenManager
+
+@pytest.fixture
+def config_path(tmp_path):
+    path = tmp_path / 'local-settings.json'
+    path.write_text(json.dumps({'kite_connect': {'api_key': 'key', 'access_token': 'old'}}))
+    return str(path)
+
+@pytest.fixture(autouse=True)
+def clear_kite_clients():
+    token_manager._KITE_CLIENTS.clear()
+    yield
+    token_manager._KITE_CLIENTS.clear()
+
+def test_config_is_parsed_once_per_file_version(config_path):
+    token_manager._read_config.cache_clear()
+    first = TokenManager(config_path)
+    second = TokenManager(config_path)
+
+    assert token_manager._read_config.cache_info().misses == 1
+    # Each manager can change its own copy
+    first.config['kite_connect']['access_token'] = 'changed'
+    assert second.config['kite_connect']['access_token'] == 'old'
+
+def test_save_config_writes_only_changes(config_path, monkeypatch):
+    manager = TokenManager(config_path)
+    writes = []
+    real_dump = json.dump
+    monkeypatch.setattr(token_manager.json, 'dump', lambda *args, **kwargs: writes.append(1) or real_dump(*args, **kwargs))
+
+    assert manager._save_config()
+    assert writes == []
+
+    assert manager._update_access_token('new')
+    assert writes == [1]
+    assert TokenManager(config_path).config['kite_connect']['access_token'] == 'new'
+
+def test_token_is_validated_only_after_the_last_check_expires(config_path, monkeypatch, fake_kite):
+    validations = []
+    monkeypatch.setattr(TokenManager, '_validate_token', lambda self: validations.append(1) or True)
+
+    TokenManager(config_path).get_valid_kite_instance()
+    assert len(validations) == 1
+
+    # The confirmation is persisted, so a new manager trusts the token without a network call
+    manager = TokenManager(config_path)
+    manager.get_valid_kite_instance()
+    manager.get_valid_kite_instance()
+    assert len(validations) == 1
+
+    manager.last_token_check -= token_manager.TOKEN_REFRESH_THRESHOLD
+    manager.get_valid_kite_instance()
+    assert len(validations) == 2
+
+def test_kite_client_is_shared_and_follows_the_token(config_path, monkeypatch, fake_kite):
+    monkeypatch.setattr(TokenManager, '_validate_token', lambda self: True)
+    manager = TokenManager(config_path)
+
+    kite = manager.get_valid_kite_instance()
+    assert TokenManager(config_path).get_valid_kite_instance() is kite
+    # The client is created once, with the shared connection pool and retry policy
+    assert [(client.api_key, client.pool) for client in fake_kite] == [('key', token_manager.KITE_HTTP_POOL)]
+
+    manager._update_access_token('new')
+    assert manager.get_valid_kite_instance() is kite
+    assert kite.access_token == 'new'
+
+def test_token_state_follows_manual_refresh_and_invalidation(config_path, monkeypatch, fake_kite):
+    validations = []
+    monkeypatch.setattr(TokenManager, '_validate_token', lambda self: validations.append(1) or True)
+    monkeypatch.setattr('auth.token_generator.generate_access_token', lambda request_token, api_key, api_secret: 'fresh')
+    manager = TokenManager(config_path)
+    manager.config['kite_connect']['api_secret'] = 'secret'
+
+    # A freshly generated token is trusted without a validation call
+    assert manager.manual_token_refresh('request')
+    manager.get_valid_kite_instance()
+    assert validations == []
+
+    manager.invalidate_token()
+    assert 'last_token_check' not in TokenManager(config_path).config['kite_connect']
+    manager.get_valid_kite_instance()
+    assert validations == [1]
+
+def test_concurrent_callers_check_an_expired_token_once(config_path, monkeypatch, fake_kite):
+    validations = []
+
+    def slow_validate(manager):
+        validations.append(1)
+        time.sleep(0.05)
+        return True
+
+    monkeypatch.setattr(TokenManager, '_validate_token', slow_validate)
+    manager = TokenManager(config_path)
+
+    threads = [threading.Thread(target=manager.get_valid_kite_instance) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(validations) == 1
@@ -6,6 +6,8 @@ Demonstrates the tool-based AI agent functionality.
 import os
 import sys
 import logging
+import threading
+import importlib
 import pytest
 import pandas as pd
 
@@ -34,6 +36,14 @@ def instruments_csv_fixture():
     yield csv_path
     os.remove(csv_path)
 
+@pytest.fixture
+def empty_search_cache():
+    """Start with an empty shared search cache and drop the fake results afterwards."""
+    search_cache = importlib.import_module('ai_agent.tool_based_agent.tool_based_agent')._SEARCH_CACHE
+    search_cache.clear()
+    yield
+    search_cache.clear()
+
 def test_tool_based_agent():
     """Test the tool-based AI agent."""
     print("🧪 Testing Tool-Based AI Agent")
@@ -140,6 +150,210 @@ def test_individual_tools(instruments_csv_fixture, monkeypatch):
     
     print("\n✅ Individual Tools Test Completed!")
 
+def test_parse_user_intent():
+    """Test intent classification from user input."""
+    agent = ToolBasedAgent()
+
+    assert agent._parse_user_intent("Reset workflow") == {'type': 'reset'}
+    assert agent._parse_user_intent("Fetch data for selected instruments") == {'type': 'data_collection'}
+
+    intent = agent._parse_user_intent("Show me NIFTY futures on NSE")
+    assert intent['type'] == 'search'
+    assert intent['search_terms'] == ['nifty', 'futures', 'nse']
+    assert intent['preferred_exchanges'] == ['NSE', 'NFO']
+    assert intent['preferred_types'] == ['FUT']
+
+    # Exchanges and types are matched on whole words, not substrings
+    intent = agent._parse_user_intent("Search for Reliance stock")
+    assert intent['preferred_exchanges'] == []
+    assert intent['preferred_types'] == ['EQ']
+
+    # Selections are only recognized once there are results to select from
+    assert agent._parse_user_intent("1,3")['type'] == 'search'
+    agent.last_search_results = [{'tradingsymbol': 'NIFTY', 'name': 'NIFTY'}]
+    assert agent._parse_user_intent("1,3")['type'] == 'selection'
+    assert agent._parse_user_intent("banknifty")['type'] == 'selection'
+
+def test_parse_user_intent_cache_returns_fresh_intents():
+    """Test memoized intents cannot be mutated through a returned dict."""
+    agent = ToolBasedAgent()
+
+    first = agent._parse_user_intent("Find BANKNIFTY options")
+    first['search_terms'].append('mutated')
+    second = agent._parse_user_intent("Find BANKNIFTY options")
+
+    assert second['search_terms'] == ['banknifty', 'options']
+    assert second is not first
+
+def test_validate_selection():
+    """Test selection by index lists and by symbol."""
+    agent = ToolBasedAgent()
+    agent.last_search_results = [
+        {'tradingsymbol': 'NIFTY25AUGFUT', 'name': 'NIFTY'},
+        {'tradingsymbol': 'BANKNIFTY25AUGFUT', 'name': 'BANKNIFTY'},
+        {'tradingsymbol': 'RELIANCE', 'name': 'RELIANCE INDUSTRIES'},
+    ]
+    first, second, third = agent.last_search_results
+
+    assert agent._validate_selection("2") == [second]
+    assert agent._validate_selection("1,3") == [first, third]
+    assert agent._validate_selection("3 1") == [third, first]
+    assert agent._validate_selection("2, 9") == [second]
+    assert agent._validate_selection("banknifty25augfut") == [second]
+
+def test_validate_selection_falls_back_to_instrument_details():
+    """Test selections outside the last results are looked up by symbol."""
+    agent = ToolBasedAgent()
+    agent.last_search_results = [{'tradingsymbol': 'NIFTY25AUGFUT', 'name': 'NIFTY'}]
+    looked_up = []
+    
+    def fake_details(identifier):
+        looked_up.append(identifier)
+        return {'tradingsymbol': identifier}
+    
+    agent.available_tools = {'get_instrument_details': fake_details}
+    
+    assert agent._validate_selection("LT") == [{'tradingsymbol': 'LT'}]
+    assert agent._validate_selection("NIFTY 50") == [{'tradingsymbol': 'NIFTY 50'}]
+    assert looked_up == ['LT', 'NIFTY 50']
+
+def test_validate_selection_by_instrument_token():
+    """Test a number beyond the last results is looked up as an instrument token."""
+    agent = ToolBasedAgent()
+    agent.last_search_results = [{'tradingsymbol': 'NIFTY25AUGFUT', 'name': 'NIFTY'}]
+    nifty_index = {'instrument_token': 256265, 'tradingsymbol': 'NIFTY 50'}
+    looked_up = []
+    
+    def fake_details(identifier):
+        looked_up.append(identifier)
+        return nifty_index if identifier == '256265' else None
+    
+    agent.available_tools = {'get_instrument_details': fake_details}
+    
+    assert agent._validate_selection("256265") == [nifty_index]
+    assert agent._validate_selection("1") == agent.last_search_results
+    assert agent._validate_selection("nifty, banknifty") == []
+    assert looked_up == ['256265', 'nifty, banknifty']
+
+def test_get_status_tracks_state_changes():
+    """Test the cached status snapshot is rebuilt when agent state changes."""
+    agent = ToolBasedAgent()
+
+    status = agent.get_status()
+    assert status['current_phase'] == 'idle'
+    assert status['conversation_length'] == 0
+    assert status['available_tools'] == [
+        'search_instruments', 'get_instrument_details',
+        'fetch_instrument_data', 'fetch_multiple_instruments'
+    ]
+
+    agent.process_user_input("Reset workflow")
+    agent.last_search_results = [{'tradingsymbol': 'NIFTY', 'name': 'NIFTY'}]
+    status = agent.get_status()
+    assert status['conversation_length'] == 1
+    assert status['last_search_results_count'] == 1
+
+def test_search_results_are_cached(empty_search_cache):
+    """Test repeated searches reuse cached tool results but still update agent state."""
+    agent = ToolBasedAgent()
+    instrument = {'tradingsymbol': 'NIFTY25AUGFUT', 'name': 'NIFTY', 'exchange': 'NFO', 'instrument_type': 'FUT'}
+    calls = []
+    
+    def fake_search(search_terms, preferred_exchanges, preferred_types, limit):
+        calls.append(search_terms)
+        return {'results': [instrument], 'total_found': 1}
+    
+    agent.available_tools = {'search_instruments': fake_search}
+    agent.process_user_input("Show me NIFTY futures")
+    agent.last_search_results = []
+    agent.current_phase = "idle"
+    result = agent.process_user_input("Show me NIFTY futures")
+    
+    assert len(calls) == 1
+    assert result['phase'] == 'discovery'
+    assert agent.last_search_results == [instrument]
+
+def test_concurrent_identical_searches_share_one_call(empty_search_cache):
+    """Test a search already in flight is awaited rather than repeated."""
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+    
+    def slow_search(search_terms, preferred_exchanges, preferred_types, limit):
+        calls.append(search_terms)
+        started.set()
+        release.wait(5)
+        return {'results': [], 'total_found': 0}
+    
+    agents = [ToolBasedAgent(), ToolBasedAgent()]
+    for agent in agents:
+        agent.available_tools = {'search_instruments': slow_search}
+    results = []
+    
+    first = threading.Thread(target=lambda: results.append(agents[0]._cached_search(['tcs'], [], [])))
+    first.start()
+    started.wait(5)
+    second = threading.Thread(target=lambda: results.append(agents[1]._cached_search(['tcs'], [], [])))
+    second.start()
+    release.set()
+    first.join(5)
+    second.join(5)
+    
+    assert len(calls) == 1
+    assert results[0] is results[1]
+
+def test_reset_clears_workflow_state():
+    """Test the direct reset entry point clears state like a reset message does."""
+    agent = ToolBasedAgent()
+    agent.last_search_results = [{'tradingsymbol': 'NIFTY', 'name': 'NIFTY'}]
+    agent.selected_instruments = list(agent.last_search_results)
+    agent.current_phase = "data_collection"
+    
+    assert agent.reset() == agent.process_user_input("Reset workflow")
+    assert agent.current_phase == 'idle'
+    assert agent.selected_instruments == []
+    assert agent.last_search_results == []
+
+def test_process_user_input_stream():
+    """Test streamed processing reports the action before the final result."""
+    agent = ToolBasedAgent()
+    
+    events = list(agent.process_user_input_stream("Reset workflow"))
+    
+    assert events[0] == {'event': 'progress', 'action': 'reset'}
+    assert events[1]['event'] == 'result'
+    assert events[1]['result']['action'] == 'reset'
+    assert events[1]['result']['phase'] == 'idle'
+    assert len(agent.conversation_history) == 1
+
+def test_warm_up_leaves_state_unchanged():
+    """Test warming up loads the tools without recording a turn."""
+    agent = ToolBasedAgent()
+    version = agent.state_version
+    
+    agent.warm_up()
+    
+    assert set(agent.available_tools) == {
+        'search_instruments', 'get_instrument_details',
+        'fetch_instrument_data', 'fetch_multiple_instruments'
+    }
+    assert agent.state_version == version
+    assert len(agent.conversation_history) == 0
+
+def test_state_version_changes_with_each_turn():
+    """Test the status version moves on turns and resets but not on status reads."""
+    agent = ToolBasedAgent()
+    
+    version = agent.state_version
+    agent.get_status()
+    assert agent.state_version == version
+    
+    agent.process_user_input("Reset workflow")
+    after_turn = agent.state_version
+    assert after_turn > version
+    agent.reset()
+    assert agent.state_version > after_turn
+
 if __name__ == '__main__':
     try:
         test_tool_based_agent()